@@ -1,26 +1,97 @@
 import click
-import os
+import logging
 import sys
 
 from pathlib import Path
 
-from .ivy import config, shims
-
-from porter import extraction
+# Note that we import Ivy (and everything that imports it, which is nearly all of Porter) only once a command
+# actually needs it, so that `porter --help` and mistyped arguments don't pay seconds of import time.
 
 sys.setrecursionlimit(1000000)  # booyah
-config.init_parameters()
 
 
-@click.command()
-@click.argument('isolate')
-def extract(isolate):
-    path = Path(isolate)
-    if not path.is_absolute():
-        path = Path(os.getcwd(), path)
+class PorterCLI(click.Group):
+    "`porter serve ...` runs a subcommand; anything else is a list of isolates to extract."
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and args[0] not in ctx.help_option_names:
+            args = ["extract"] + args
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=PorterCLI)
+def main():
+    pass
+
+
+cache_dir_option = click.option(
+    '--cache-dir', envvar='PORTER_CACHE_DIR', type=click.Path(file_okay=False, path_type=Path),
+    help="Reuse converted programs from this directory when the isolate and its includes are unchanged.")
+
+
+@main.command()
+@click.argument('isolates', nargs=-1, required=True, type=click.Path(exists=True, path_type=Path))
+@click.option('-o', '--output-dir', type=click.Path(file_okay=False, path_type=Path),
+              help="Write one .scala file per isolate into this directory, rather than printing to stdout.")
+@click.option('-j', '--jobs', default=1, type=click.IntRange(min=1),
+              help="Extract up to this many isolates at once, each in its own worker process.")
+@click.option('--watch', is_flag=True,
+              help="Keep running, and re-extract the isolate whenever it or anything it includes changes.")
+@click.option('--reachable-only', is_flag=True,
+              help="Only extract the actions and functions that exported actions, initializers and conjectures "
+                   "can reach.")
+@click.option('--hash-cons', is_flag=True,
+              help="Share each expression that occurs more than once in an isolate between its occurrences, so that "
+                   "large isolates take less memory.")
+@click.option('--reproducible', is_flag=True,
+              help="Stamp the output with a digest of the isolate and its includes, rather than the time, and emit "
+                   "actions and functions in order of name, so that unchanged isolates extract to identical files.")
+@click.option('--time-passes', is_flag=True,
+              help="Report to stderr how long each pass over each isolate took, and how big the program was after it.")
+@cache_dir_option
+def extract(isolates, output_dir, jobs, watch, reachable_only, hash_cons, reproducible, cache_dir, time_passes):
+    """Extracts each ISOLATE (or every .ivy file in each directory ISOLATE) in a single process."""
+    if time_passes:
+        logging.basicConfig(format="%(message)s")
+        logging.getLogger("porter.passes").setLevel(logging.INFO)
+
+    from porter import driver
+    from porter.ivy.cache import ProgramCache
+
+    paths = driver.isolates_from_paths(isolates)
+    cache = ProgramCache(cache_dir) if cache_dir else None
+
+    if watch:
+        if len(paths) != 1:
+            raise click.UsageError("--watch takes exactly one isolate.")
+        driver.watch(paths[0], output_dir, cache, reachable_only=reachable_only, reproducible=reproducible,
+                     hash_cons=hash_cons)
+        return
+
+    if output_dir is None:
+        if len(paths) != 1:
+            raise click.UsageError("Extracting more than one isolate requires --output-dir.")
+        print(driver.extract_isolate(paths[0], cache, reachable_only=reachable_only, reproducible=reproducible,
+                                     hash_cons=hash_cons))
+        return
+
+    driver.extract_batch(paths, output_dir, cache, jobs, reachable_only, reproducible, hash_cons)
+
+
+def default_socket_path() -> Path:
+    from porter import server
+    return server.default_socket_path()
 
-    prog = shims.handle_isolate(path)
-    extracted = extraction.extract_scala(prog)
 
-    print(extracted)
+@main.command()
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False, path_type=Path),
+              default=default_socket_path, show_default=True,
+              help="The Unix socket to listen for extraction requests on.")
+@cache_dir_option
+def serve(socket_path, cache_dir):
+    """Keeps Ivy resident and serves extraction requests over a Unix socket."""
+    from porter import server
+    from porter.ivy.cache import ProgramCache
 
+    cache = ProgramCache(cache_dir) if cache_dir else None
+    server.serve(socket_path, cache)
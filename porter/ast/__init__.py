@@ -1,4 +1,5 @@
-from dataclasses import dataclass, field, KW_ONLY
+import dataclasses
+from dataclasses import dataclass, field
 
 from porter.ivy import Position
 
@@ -8,18 +9,25 @@ from ivy import ivy_utils as iu
 
 from porter.ast import sorts
 
-from typing import Any, Generic, Optional, TypeVar
+from typing import Any, Generic, Iterator, Optional, TypeVar
 
 T = TypeVar("T")
 
 
-@dataclass
+@dataclass(slots=True)
 class Binding(Generic[T]):
     name: str
     decl: T
 
 
-@dataclass()
+@dataclass(frozen=True, slots=True)
+class Detached:
+    """Stands in for an Ivy node once we've let go of it: just the parts of it that Porter actually reads."""
+    pos: Optional[Position]
+    sort: Optional[sorts.Sort]
+
+
+@dataclass(slots=True)
 class AST:
     _ivy_node: Optional[Any] = field(repr=False)
     _sort: Optional[sorts.Sort] = field(init=False, repr=False)
@@ -27,12 +35,16 @@ class AST:
     def __post_init__(self):
         if self._ivy_node is None:
             self._sort = None
+        elif isinstance(self._ivy_node, Detached):
+            self._sort = self._ivy_node.sort
         elif isinstance(self._ivy_node, iact.Action):
             # TODO: contemplate a top sort
             self._sort = None
         elif not hasattr(self._ivy_node, 'sort'):
             # raise Exception(f"Missing sort for {self._ivy_node}")
             self._sort = None
+        elif sorts.Resolver.active is not None:
+            self._sort = sorts.Resolver.active.resolve(self._ivy_node)
         else:
             # XXX: Deeply unfortunate that we've lost an explicit handle
             # to the Ivy global module.  Hopefully pulling it in like this
@@ -43,6 +55,8 @@ class AST:
     def pos(self) -> Optional[Position]:
         if self._ivy_node is None:
             return None
+        if isinstance(self._ivy_node, Detached):
+            return self._ivy_node.pos
         if not hasattr(self._ivy_node, 'lineno'):
             return None
         if not isinstance(self._ivy_node.lineno, iu.LocationTuple):
@@ -57,3 +71,42 @@ class AST:
     def ivy_node(self):
         return self._ivy_node
 
+    def detached(self) -> Optional[Detached]:
+        "What of our Ivy node we need to keep hold of once it's gone."
+        if self._ivy_node is None or isinstance(self._ivy_node, Detached):
+            return self._ivy_node
+        return Detached(self.pos(), self._sort)
+
+    def detach(self):
+        self._ivy_node = self.detached()
+
+    def __getstate__(self):
+        # Ivy nodes point back into their (unpicklable) module, so only hang on to what we read from them.
+        state = {f.name: getattr(self, f.name) for f in dataclasses.fields(self)}
+        state["_ivy_node"] = self.detached()
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+def subterms(node: AST) -> Iterator[AST]:
+    "Every node in the tree rooted at `node`, including `node` itself."
+    worklist: list = [node]
+    while worklist:
+        curr = worklist.pop()
+        if isinstance(curr, AST):
+            yield curr
+            worklist.extend(getattr(curr, f.name) for f in dataclasses.fields(curr) if not f.name.startswith("_"))
+        elif isinstance(curr, Binding):
+            worklist.append(curr.decl)
+        elif isinstance(curr, list):
+            worklist.extend(curr)
+
+
+def detach(node: AST):
+    """Drops the Ivy nodes that the tree rooted at `node` was converted from, so that nothing in it keeps the
+    Ivy module alive any longer."""
+    for curr in subterms(node):
+        curr.detach()
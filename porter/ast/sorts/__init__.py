@@ -4,35 +4,91 @@ from ivy import logic as ilog
 
 from porter.ivy import Position
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Iterable, Iterator, Mapping, Optional
+
+import weakref
 
 
 # Sorts
+#
+# Sorts are hash-consed: constructing a sort that's structurally equal to one that already exists hands back the
+# existing one.  So, two sorts are equal exactly when they're the same object, which is how they compare and hash,
+# and so sorts can key dicts (eg. to memoize a sort visitor; see visitor.Memoized).
 
 
-@dataclass(frozen=True)
-class Sort:
-    pass
+class Fields(Mapping[str, "Sort"]):
+    "A Record's fields and their sorts, in the order they were declared: a read-only, hashable dict."
+
+    __slots__ = ("_fields",)
+
+    def __init__(self, fields: Iterable[tuple[str, "Sort"]] | Mapping[str, "Sort"] = ()):
+        self._fields = dict(fields)
+
+    def __getitem__(self, name: str) -> "Sort":
+        return self._fields[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Fields):
+            other = other._fields
+        if not isinstance(other, dict):
+            return NotImplemented
+        return list(self._fields.items()) == list(other.items())
+
+    def __hash__(self) -> int:
+        return hash(tuple(self._fields.items()))
+
+    def __repr__(self) -> str:
+        return repr(self._fields)
+
+    def __reduce__(self):
+        return Fields, (tuple(self._fields.items()),)
 
 
-@dataclass(frozen=True)
+class HashConsed(type):
+    "The metaclass of sorts, which makes sure there's only ever one instance of each."
+
+    table: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+    def __call__(cls, *args, **kwargs):
+        sort = super().__call__(*args, **kwargs)
+        key = (cls,) + tuple(getattr(sort, f) for f in cls.__match_args__)
+        return HashConsed.table.setdefault(key, sort)
+
+
+@dataclass(frozen=True, slots=True, eq=False, weakref_slot=True)
+class Sort(metaclass=HashConsed):
+    def __reduce__(self):
+        # So that unpickling goes through the table too.
+        return type(self), tuple(getattr(self, f) for f in self.__match_args__)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
 class Uninterpreted(Sort):
     sort_name: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class Bool(Sort):
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class Native(Sort):
     posn: Position
     fmt: str  # TODO: in Ivy this is a NativeCode
-    args: list[Sort]
+    args: tuple[Sort, ...]
 
+    def __post_init__(self):
+        object.__setattr__(self, "args", tuple(self.args))
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True, eq=False)
 class Number(Sort):
     sort_name: str
     lo_range: Optional[int]
@@ -50,30 +106,40 @@ class Number(Sort):
         return self.sort_name
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class BitVec(Sort):
     width: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class Enum(Sort):
     sort_name: str
     discriminants: tuple[str, ...]
 
+    def __post_init__(self):
+        object.__setattr__(self, "discriminants", tuple(self.discriminants))
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class Function(Sort):
-    domain: list[Sort]
+    domain: tuple[Sort, ...]
     range: Sort
 
+    def __post_init__(self):
+        object.__setattr__(self, "domain", tuple(self.domain))
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class Record(Sort):
     sort_name: str
-    fields: dict[str, Sort]
+    fields: Fields
 
+    def __post_init__(self):
+        if not isinstance(self.fields, Fields):
+            object.__setattr__(self, "fields", Fields(self.fields))
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True, eq=False)
 class Top(Sort):
     pass
 
@@ -113,11 +179,15 @@ def sorts_with_members(im: imod.Module) -> dict[str, ilog.Const]:
 
 
 def record_from_ivy(im: imod.Module, name: str) -> Record:
+    return _record_from_destructors(im, name, sorts_with_members(im)[name])
+
+
+def _record_from_destructors(im: imod.Module, name: str, destructors) -> Record:
     fields = {}
-    for c in sorts_with_members(im)[name]:
+    for c in destructors:
         field_name = c.name.rsplit(".", 1)[-1]
         # field_name = strip_prefixes([name], ".", c.name)
-        field_sort = from_ivy(im, c.sort)
+        field_sort = resolve(im, c.sort)
         assert isinstance(field_sort, Function)
         fields[field_name] = field_sort.range
 
@@ -133,6 +203,24 @@ def record_from_ivy(im: imod.Module, name: str) -> Record:
     return Record(name, fields)
 
 
+class RecordIndex:
+    """Every record sort in a module, and the sorts of all their fields, so that we needn't rebuild them each
+    time we come across something that might be a field access."""
+
+    records: dict[str, Record]
+    fields: dict[tuple[str, str], Sort]
+
+    def __init__(self, im: imod.Module):
+        self.records = {name: _record_from_destructors(im, name, destructors)
+                        for name, destructors in sorts_with_members(im).items()}
+        self.fields = {(name, field_name): sort
+                       for name, rec in self.records.items()
+                       for field_name, sort in rec.fields.items()}
+
+    def field(self, sort_name: str, field_name: str) -> Optional[Sort]:
+        return self.fields.get((sort_name, field_name))
+
+
 def from_ivy(im: imod.Module, sort) -> Sort:
     if hasattr(sort, "name"):
         name = sort.name
@@ -177,3 +265,68 @@ def from_ivy(im: imod.Module, sort) -> Sort:
     if isinstance(sort, ilog.TopSort):
         return Top()
     raise Exception(f"TODO {type(sort)}")
+
+
+def _resolves_by_name(sort) -> bool:
+    "Whether from_ivy() answers for `sort` directly, rather than looking through to `sort.sort`."
+    if getattr(sort, "name", None) in ("bool", "int", "nat"):
+        return True
+    return isinstance(sort, (ilog.UninterpretedSort, ilog.EnumeratedSort))
+
+
+class Resolver:
+    """Translates the Ivy sorts of a single module into Porter sorts, remembering each one it has translated
+    (by the Ivy sort's identity) so that we only do so once.
+
+    While a Resolver is active (that is, inside its `with` block), AST nodes resolve their sorts through it."""
+
+    active: Optional["Resolver"] = None
+
+    im: imod.Module
+    # Keyed by id(), so we hang on to the Ivy sort to ensure its id isn't reused.
+    resolved: dict[int, tuple[Any, Sort]]
+
+    def __init__(self, im: imod.Module):
+        self.im = im
+        self.resolved = {}
+        self.prev = None
+        self._records: Optional[RecordIndex] = None
+
+    def __enter__(self) -> "Resolver":
+        self.prev = Resolver.active
+        Resolver.active = self
+        return self
+
+    def __exit__(self, *_):
+        Resolver.active = self.prev
+
+    def resolve(self, sort) -> Sort:
+        "The Porter sort for an Ivy sort, or for an Ivy node that has one."
+        while hasattr(sort, "sort") and not _resolves_by_name(sort):
+            sort = sort.sort
+        hit = self.resolved.get(id(sort))
+        if hit is None:
+            hit = (sort, from_ivy(self.im, sort))
+            self.resolved[id(sort)] = hit
+        return hit[1]
+
+    def records(self) -> RecordIndex:
+        if self._records is None:
+            self._records = RecordIndex(self.im)
+        return self._records
+
+
+def resolve(im: imod.Module, sort) -> Sort:
+    "from_ivy(), through the active Resolver if it's one for `im`."
+    resolver = Resolver.active
+    if resolver is not None and resolver.im is im:
+        return resolver.resolve(sort)
+    return from_ivy(im, sort)
+
+
+def records(im: imod.Module) -> RecordIndex:
+    "The RecordIndex for `im`: the active Resolver's if it's one for `im`, or else a new one."
+    resolver = Resolver.active
+    if resolver is not None and resolver.im is im:
+        return resolver.records()
+    return RecordIndex(im)
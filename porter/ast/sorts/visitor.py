@@ -1,4 +1,5 @@
-from typing import Generic, Optional, TypeVar
+from typing import ClassVar, Generic, Optional, TypeVar
+from weakref import WeakKeyDictionary
 
 from porter.ast.sorts import Bool, BitVec, Enum, Function, Native, Number, Record, Uninterpreted, Sort, Top
 from porter.ivy import Position
@@ -91,6 +92,29 @@ class Visitor(Generic[T]):
         raise UnimplementedASTNodeHandler(Uninterpreted)
 
 
+class Memoized(Visitor[T]):
+    """A visitor that remembers what it made of each sort it has visited, rather than visiting it again.  Since
+    sorts are hash-consed, looking one up is a matter of its identity.
+
+    By default each visitor has a memo of its own.  Subclasses declared with `shared=True`, whose results depend
+    on nothing but the sort visited, share one memo among all their instances."""
+
+    shared_memo: ClassVar[Optional[WeakKeyDictionary]] = None
+
+    def __init_subclass__(cls, shared=False, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.shared_memo = WeakKeyDictionary() if shared else None
+
+    def visit_sort(self, sort: Sort) -> T:
+        memo = self.shared_memo
+        if memo is None:
+            memo = self.__dict__.setdefault("_memo", WeakKeyDictionary())
+        if sort in memo:
+            return memo[sort]
+        ret = memo[sort] = super().visit_sort(sort)
+        return ret
+
+
 class MutVisitor(Visitor[None]):
     def bool(self):
         pass
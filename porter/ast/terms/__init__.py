@@ -14,61 +14,61 @@ T = TypeVar("T")
 class Expr(AST):
     # TODO: what should the relationship between an Expr and a Formula be?
     # At the present they're the same.  That's probably fine?
-    pass
+    __slots__ = ()
 
 
-@dataclass
+@dataclass(slots=True)
 class Constant(Expr):
     rep: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Var(Expr):
     rep: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BinOp(Expr):
     lhs: Expr
     op: str
     rhs: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Apply(Expr):
     # TODO: should this instead be called Atom?
     relsym: str
     args: list[Expr]
 
 
-@dataclass
+@dataclass(slots=True)
 class Exists(Expr):
     # XXX: should this be a list of Vars instead?
     vars: list[Binding[Sort]]
     expr: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Forall(Expr):
     # XXX: should this be a list of Vars instead?
     vars: list[Binding[Sort]]
     expr: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class FieldAccess(Expr):
     struct: Expr
     fname: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Ite(Expr):
     test: Expr
     then: Expr
     els: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class NativeExpr(Expr):
     lang: str
     fmt: str  # TODO: in Ivy this is a NativeCode
@@ -80,7 +80,7 @@ class NativeExpr(Expr):
 SomeStrategy = Enum("SomeStrategy", ["ARBITRARY", "MINIMISE", "MAXIMISE"])
 
 
-@dataclass
+@dataclass(slots=True)
 class Some(Expr):
     # TODO: I would like to rename this node.
     vars: list[Binding[Sort]]
@@ -88,7 +88,7 @@ class Some(Expr):
     strat: SomeStrategy
 
 
-@dataclass
+@dataclass(slots=True)
 class UnOp(Expr):
     op: Any
     expr: Expr
@@ -97,23 +97,23 @@ class UnOp(Expr):
 #
 
 
-@dataclass
+@dataclass(slots=True)
 class Action(AST):
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class Assert(Action):
     pred: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Assign(Action):
     lhs: Expr
     rhs: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class LogicalAssign(Action):
     relsym: str
     vars: list[Expr]
@@ -131,50 +131,50 @@ class LogicalAssign(Action):
         return None
 
 
-@dataclass
+@dataclass(slots=True)
 class Assume(Action):
     pred: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Call(Action):
     app: Apply
 
 
-@dataclass
+@dataclass(slots=True)
 class Debug(Action):
     msg: str
     args: list[Binding[Expr]]
 
 
-@dataclass
+@dataclass(slots=True)
 class Ensures(Action):
     pred: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Havok(Action):
     modifies: list[Expr]
 
 
-@dataclass
+@dataclass(slots=True)
 class If(Action):
     test: Expr
     then: Action
     els: Optional[Action]
 
-@dataclass
+@dataclass(slots=True)
 class Init(Action):
     params: list[Binding[Sort]]
     act: Action
 
-@dataclass
+@dataclass(slots=True)
 class Let(Action):
     vardecls: list[Binding[Sort]]
     scope: Action
 
 
-@dataclass
+@dataclass(slots=True)
 class NativeAct(Action):
     # TODO: these are all the same fields as a NativeExpr.  Unify?
     lang: str
@@ -182,17 +182,17 @@ class NativeAct(Action):
     args: list[Expr]
 
 
-@dataclass
+@dataclass(slots=True)
 class Requires(Action):
     pred: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Sequence(Action):
     stmts: list[Action]
 
 
-@dataclass
+@dataclass(slots=True)
 class While(Action):
     test: Expr
     decreases: Optional[Expr]
@@ -202,13 +202,13 @@ class While(Action):
 ActionKind = Enum("ActionKind", ["NORMAL", "EXPORTED", "IMPORTED"])
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionDefinition(AST):
     formal_params: list[Binding[Sort]]
     body: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class ActionDefinition(AST):
     kind: ActionKind
     formal_params: list[Binding[Sort]]
@@ -221,7 +221,7 @@ class ActionDefinition(AST):
 
 #
 
-@dataclass
+@dataclass(slots=True)
 class Program(AST):
     sorts: dict[str, Sort]
 
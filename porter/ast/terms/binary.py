@@ -0,0 +1,349 @@
+import io
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from porter.ast import sorts, terms
+from porter.ast.sorts import Sort
+from porter.ast.terms.flat import FlatProgram
+from porter.ivy import Position
+
+from typing import Any, BinaryIO, Callable, Iterator, Sequence, TypeVar, Union
+
+T = TypeVar("T")
+
+# The on-disk form of a FlatProgram.  After a fixed header come its sections, each aligned to eight bytes, and in
+# the order of SECTIONS:
+#
+#   magic           8 bytes, MAGIC
+#   version         u32, VERSION
+#   section count   u32
+#   sections        (u64 offset, u64 length) for each section
+#
+# Everything is little-endian.  The node columns are stored just as FlatProgram holds them, so that a loaded
+# program can read them straight out of the mapped file; symbols, sorts and positions are decoded as they're asked
+# for.  Symbols are one run of UTF-8 and the offset at which each begins (and one more, where the last one ends).
+# A position is a filename symbol, a line and the index of the position it refers to, or -1.  A sort is the
+# index of its class in SORT_KINDS followed by its fields (see the tags below) in the offset run of its section.
+
+MAGIC = b"PORTERP\0"
+# Bump this whenever the layout changes, or NODE_KINDS or SORT_KINDS do other than grow.
+VERSION = 1
+
+HEADER = struct.Struct("<8sII")
+SECTION = struct.Struct("<QQ")
+
+# Each section, and the array typecode of its elements.
+SECTIONS: tuple[tuple[str, str], ...] = (
+    ("symbol_data", "B"),
+    ("symbol_offsets", "q"),
+    ("positions", "i"),
+    ("sort_offsets", "q"),
+    ("sort_data", "q"),
+    ("kind", "B"),
+    ("symbol", "i"),
+    ("sort", "i"),
+    ("pos", "i"),
+    ("first", "i"),
+    ("operand_start", "i"),
+    ("operands", "i"),
+)
+SECTION_CODES: dict[str, str] = dict(SECTIONS)
+
+SORT_KINDS: tuple[type, ...] = (
+    sorts.Uninterpreted, sorts.Bool, sorts.Native, sorts.Number, sorts.BitVec, sorts.Enum, sorts.Function,
+    sorts.Record, sorts.Top,
+)
+SORT_KIND_OF: dict[type, int] = {cls: i for i, cls in enumerate(SORT_KINDS)}
+
+# Tags for the fields of a sort, as with a FlatProgram's operands.
+TAG_BITS = 3
+NONE, SYM, INT, SORT, POS, TUPLE, FIELDS = range(7)
+
+
+class FormatError(Exception):
+    pass
+
+
+def dump(prog: Union[terms.Program, FlatProgram], f: BinaryIO):
+    "Writes out `prog` (flattening it first, if it isn't already) to the binary file `f`."
+    flat = prog if isinstance(prog, FlatProgram) else FlatProgram.from_program(prog)
+    sections = _Writer(flat).sections()
+
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for data in sections:
+        offset = _aligned(offset)
+        table.append((offset, len(data)))
+        offset += len(data)
+
+    f.write(HEADER.pack(MAGIC, VERSION, len(sections)))
+    for entry in table:
+        f.write(SECTION.pack(*entry))
+    written = HEADER.size + SECTION.size * len(sections)
+    for (offset, _), data in zip(table, sections):
+        f.write(b"\0" * (offset - written))
+        f.write(data)
+        written = offset + len(data)
+
+
+def dumps(prog: Union[terms.Program, FlatProgram]) -> bytes:
+    buf = io.BytesIO()
+    dump(prog, buf)
+    return buf.getvalue()
+
+
+def load(path: Path) -> FlatProgram:
+    """Maps the file at `path` into memory and reads the FlatProgram in it.  Nothing is decoded until something
+    asks for it: its nodes, symbols, sorts and positions are each built the first time they're looked up."""
+    with open(path, "rb") as f:
+        if f.seek(0, 2) < HEADER.size:
+            raise FormatError(f"{path} is too short to be a program")
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads(buf)
+
+
+def loads(buf) -> FlatProgram:
+    "As load(), but from a buffer that's already in memory."
+    view = memoryview(buf)
+    if len(view) < HEADER.size:
+        raise FormatError("Too short to be a program")
+    magic, version, count = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise FormatError("Not a program")
+    if version != VERSION:
+        raise FormatError(f"Program is in format version {version}; we read version {VERSION}")
+    if count != len(SECTIONS):
+        raise FormatError(f"Expected {len(SECTIONS)} sections but found {count}")
+    if HEADER.size + SECTION.size * count > len(view):
+        raise FormatError("Section table runs off the end")
+
+    columns: dict[str, Any] = {}
+    for i, (name, code) in enumerate(SECTIONS):
+        offset, length = SECTION.unpack_from(view, HEADER.size + SECTION.size * i)
+        if offset + length > len(view):
+            raise FormatError(f"Section {name} runs off the end")
+        if offset % 8 or length % array(code).itemsize:
+            raise FormatError(f"Section {name} is misaligned")
+        columns[name] = _column(view[offset:offset + length], code)
+    _check(columns)
+
+    flat = FlatProgram()
+    for name in ("kind", "symbol", "sort", "pos", "first", "operand_start", "operands"):
+        setattr(flat, name, columns[name])
+
+    reader = _Reader(columns)
+    flat.symbols = reader.symbols
+    flat.sorts = reader.sorts
+    flat.positions = reader.positions
+    return flat
+
+
+def load_program(path: Path) -> terms.Program:
+    """Reads the Program in the file at `path`, all of it, up front.  Unlike load(), anything wrong with the file
+    turns up here, as a FormatError, rather than whenever some part of it is first looked at."""
+    flat = load(path)
+    try:
+        for i in range(len(flat)):
+            # Which is also what keeps node() from chasing its tail.
+            if any(c >= i for c in flat.children(i)):
+                raise FormatError(f"{path} is corrupt: its nodes aren't in post-order")
+        return flat.to_program()
+    except (AssertionError, IndexError, KeyError, RecursionError, TypeError, ValueError, struct.error) as e:
+        # A UnicodeDecodeError is a ValueError, too.
+        raise FormatError(f"{path} is corrupt: {e!r}") from e
+
+
+def _check(columns: dict[str, Any]):
+    "That the columns agree on how many nodes, symbols, sorts and positions there are."
+    nodes = len(columns["kind"])
+    for name in ("symbol", "sort", "pos", "first"):
+        if len(columns[name]) != nodes:
+            raise FormatError(f"Expected {nodes} entries in {name} but found {len(columns[name])}")
+    if len(columns["operand_start"]) != nodes + 1:
+        raise FormatError(f"Expected {nodes + 1} entries in operand_start but found {len(columns['operand_start'])}")
+    for name, data in (("symbol_offsets", "symbol_data"), ("sort_offsets", "sort_data"),
+                       ("operand_start", "operands")):
+        offsets = columns[name]
+        if len(offsets) == 0 or offsets[-1] > len(columns[data]) or any(a > b for a, b in zip(offsets, offsets[1:])):
+            raise FormatError(f"{name} doesn't index into {data}")
+    if len(columns["positions"]) % 3:
+        raise FormatError("Positions aren't in threes")
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _column(view: memoryview, code: str):
+    if sys.byteorder == "little":
+        return view.cast(code)
+    ret = array(code, view.tobytes())
+    ret.byteswap()
+    return ret
+
+
+def _little_endian(a: array) -> bytes:
+    if sys.byteorder != "little":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+class _Writer:
+    """Works out the side tables to write out for a FlatProgram.  These start off as the FlatProgram's own, but
+    also take in the sorts, positions and symbols that those refer to in turn."""
+
+    def __init__(self, flat: FlatProgram):
+        self.flat = flat
+        self.symbols: list[str] = list(flat.symbols)
+        self.sorts: list[Sort] = list(flat.sorts)
+        self.positions: list[Position] = list(flat.positions)
+        self.symbol_ids = {s: i for i, s in enumerate(self.symbols)}
+        self.sort_ids = {s: i for i, s in enumerate(self.sorts)}
+        self.position_ids = {p: i for i, p in enumerate(self.positions)}
+
+    def sections(self) -> list[bytes]:
+        # Encoding a sort can add sorts and positions to the tables, and a position can add positions, so the tables
+        # can grow as we go along; hence, indices rather than iterators.  Symbols come last since both add them.
+        sort_offsets = array("q", [0])
+        sort_data = array("q")
+        i = 0
+        while i < len(self.sorts):
+            s = self.sorts[i]
+            sort_data.append(SORT_KIND_OF[type(s)])
+            for f in type(s).__match_args__:
+                self.sort_field(sort_data, getattr(s, f))
+            sort_offsets.append(len(sort_data))
+            i += 1
+
+        positions = array("i")
+        i = 0
+        while i < len(self.positions):
+            p = self.positions[i]
+            ref = -1 if p.reference is None else self.intern(self.position_ids, self.positions, p.reference)
+            positions.extend((self.intern(self.symbol_ids, self.symbols, str(p.filename)), p.line, ref))
+            i += 1
+
+        symbol_data = bytearray()
+        symbol_offsets = array("q", [0])
+        for s in self.symbols:
+            symbol_data += s.encode()
+            symbol_offsets.append(len(symbol_data))
+
+        flat = self.flat
+        columns = {
+            "symbol_data": bytes(symbol_data),
+            "symbol_offsets": _little_endian(symbol_offsets),
+            "positions": _little_endian(positions),
+            "sort_offsets": _little_endian(sort_offsets),
+            "sort_data": _little_endian(sort_data),
+        }
+        for name in ("kind", "symbol", "sort", "pos", "first", "operand_start", "operands"):
+            columns[name] = _little_endian(array(SECTION_CODES[name], getattr(flat, name)))
+        return [columns[name] for name, _ in SECTIONS]
+
+    def sort_field(self, out: array, val):
+        if val is None:
+            out.append(NONE)
+        elif isinstance(val, str):
+            out.append(self.intern(self.symbol_ids, self.symbols, val) << TAG_BITS | SYM)
+        elif isinstance(val, int):
+            out.append(val << TAG_BITS | INT)
+        elif isinstance(val, Sort):
+            out.append(self.intern(self.sort_ids, self.sorts, val) << TAG_BITS | SORT)
+        elif isinstance(val, Position):
+            out.append(self.intern(self.position_ids, self.positions, val) << TAG_BITS | POS)
+        elif isinstance(val, sorts.Fields):
+            out.append(len(val) << TAG_BITS | FIELDS)
+            for name, s in val.items():
+                self.sort_field(out, name)
+                self.sort_field(out, s)
+        elif isinstance(val, tuple):
+            out.append(len(val) << TAG_BITS | TUPLE)
+            for v in val:
+                self.sort_field(out, v)
+        else:
+            raise Exception(f"Can't write out a sort holding {val!r}")
+
+    @staticmethod
+    def intern(ids: dict, table: list, val) -> int:
+        ret = ids.get(val)
+        if ret is None:
+            ret = ids[val] = len(table)
+            table.append(val)
+        return ret
+
+
+class Lazy(Sequence[T]):
+    "A table whose entries are each decoded the first time they're looked up."
+
+    def __init__(self, length: int, decode: Callable[[int], T]):
+        self._entries: list[Any] = [Lazy] * length
+        self._decode = decode
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        ret = self._entries[i]
+        if ret is Lazy:
+            ret = self._entries[i] = self._decode(i)
+        return ret
+
+    def __iter__(self) -> Iterator[T]:
+        return (self[i] for i in range(len(self)))
+
+
+class _Reader:
+    "Decodes the side tables of a program on demand."
+
+    def __init__(self, columns: dict[str, Any]):
+        self.columns = columns
+        self.symbols: Lazy[str] = Lazy(len(columns["symbol_offsets"]) - 1, self.symbol)
+        self.sorts: Lazy[Sort] = Lazy(len(columns["sort_offsets"]) - 1, self.sort)
+        self.positions: Lazy[Position] = Lazy(len(columns["positions"]) // 3, self.position)
+
+    def symbol(self, i: int) -> str:
+        offsets = self.columns["symbol_offsets"]
+        return sys.intern(self.columns["symbol_data"][offsets[i]:offsets[i + 1]].tobytes().decode())
+
+    def position(self, i: int) -> Position:
+        fn, line, ref = self.columns["positions"][3 * i:3 * i + 3]
+        return Position(Path(self.symbols[fn]), line, None if ref < 0 else self.positions[ref])
+
+    def sort(self, i: int) -> Sort:
+        offsets = self.columns["sort_offsets"]
+        data = self.columns["sort_data"][offsets[i]:offsets[i + 1]]
+        cursor = 1
+
+        def field() -> Any:
+            nonlocal cursor
+            op = data[cursor]
+            cursor += 1
+            tag, payload = op & ((1 << TAG_BITS) - 1), op >> TAG_BITS
+            if tag == NONE:
+                return None
+            elif tag == SYM:
+                return self.symbols[payload]
+            elif tag == INT:
+                return payload
+            elif tag == SORT:
+                return self.sorts[payload]
+            elif tag == POS:
+                return self.positions[payload]
+            elif tag == FIELDS:
+                ret = []
+                for _ in range(payload):
+                    name = field()
+                    ret.append((name, field()))
+                return sorts.Fields(ret)
+            else:
+                return tuple(field() for _ in range(payload))
+
+        cls = SORT_KINDS[data[0]]
+        return cls(*(field() for _ in cls.__match_args__))
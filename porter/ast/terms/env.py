@@ -0,0 +1,85 @@
+from porter.ast import Binding
+from porter.ast.sorts import Sort
+
+from typing import Iterable, Optional
+
+# In an Env that isn't the root: what the name it differs by was bound to in the next Env along, if anything.
+_UNBOUND = object()
+
+
+class Env:
+    """A persistent map from the names bound around some term to the sorts they're bound at (or None, for those
+    without one).  Binding more names gives back a new Env and leaves this one as it was, so a visitor can simply
+    hang on to the Env it had outside a binder and go back to it afterwards.
+
+    All the Envs made from one another share a single dict, which holds the bindings of whichever of them was
+    looked at last (the "root").  Every other Env instead records how it differs from the next one along the chain
+    towards the root, a binding at a time.  Looking at a different Env first reverses the chain between it and the
+    old root, patching the dict as it goes, so that it becomes the root in turn (Baker's shallow binding).  Lookups
+    in the root are then a single dict probe.  Visitors only ever step from an Env to one bound within it and back
+    again, which costs one patch per name bound, however deeply binders nest and however many names they bind.
+
+    As they share that dict, Envs made from one another shouldn't be used from more than one thread at once;
+    each visitor makes its own."""
+
+    __slots__ = ("_table", "_name", "_sort", "_next")
+
+    def __init__(self):
+        self._table: Optional[dict[str, Optional[Sort]]] = {}
+        self._name: Optional[str] = None
+        self._sort: object = _UNBOUND
+        self._next: Optional[Env] = None
+
+    def bind(self, name: str, sort: Optional[Sort]) -> "Env":
+        "This Env, with `name` (re)bound to `sort`."
+        table = self._reroot()
+        ret = Env.__new__(Env)
+        ret._table, ret._name, ret._sort, ret._next = table, None, _UNBOUND, None
+        # We now differ from the new root by however `name` was bound here.
+        self._table, self._name, self._sort, self._next = None, name, table.get(name, _UNBOUND), ret
+        table[name] = sort
+        return ret
+
+    def bind_all(self, bindings: Iterable[Binding[Optional[Sort]]]) -> "Env":
+        ret = self
+        for b in bindings:
+            ret = ret.bind(b.name, b.decl)
+        return ret
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._reroot()
+
+    def __getitem__(self, name: str) -> Optional[Sort]:
+        return self._reroot()[name]
+
+    def get(self, name: str) -> Optional[Sort]:
+        "The sort `name` is bound at, or None if it's either bound without one or not bound at all."
+        return self._reroot().get(name)
+
+    def names(self) -> dict[str, Optional[Sort]]:
+        "Everything bound here, as an ordinary dict."
+        return dict(self._reroot())
+
+    def _reroot(self) -> dict[str, Optional[Sort]]:
+        if self._table is not None:
+            return self._table
+
+        path = []
+        curr = self
+        while curr._table is None:
+            path.append(curr)
+            curr = curr._next
+        table = curr._table
+
+        # Starting nearest the old root, make each Env on the path the root in turn, leaving the one it differed
+        # from to record how to undo that.
+        for env in reversed(path):
+            old_root = env._next
+            name, sort = env._name, env._sort
+            old_root._table, old_root._name, old_root._sort, old_root._next = None, name, table.get(name, _UNBOUND), env
+            if sort is _UNBOUND:
+                del table[name]
+            else:
+                table[name] = sort
+            env._table, env._name, env._sort, env._next = table, None, _UNBOUND, None
+        return table
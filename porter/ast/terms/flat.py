@@ -0,0 +1,296 @@
+import dataclasses
+from array import array
+from enum import Enum
+
+from porter.ast import AST, Binding, Detached
+from porter.ast.sorts import Sort
+from porter.ast.terms import *
+from porter.ivy import Position
+
+from typing import Any, Iterator, Optional
+
+# Every sort of node a FlatProgram can hold; a node's kind is its class's index in here.  Only ever append to this,
+# since the indices are baked into anything we've encoded.
+NODE_KINDS: tuple[type, ...] = (
+    Constant, Var, BinOp, Apply, Exists, Forall, FieldAccess, Ite, NativeExpr, Some, UnOp,
+    Action, Assert, Assign, LogicalAssign, Assume, Call, Debug, Ensures, Havok, If, Init, Let, NativeAct, Requires,
+    Sequence, While,
+    FunctionDefinition, ActionDefinition, Program,
+)
+KIND_OF: dict[type, int] = {cls: i for i, cls in enumerate(NODE_KINDS)}
+
+# Likewise for the enumerations that nodes hold.
+ENUM_MEMBERS: tuple[Enum, ...] = (*SomeStrategy, *ActionKind)
+ENUM_INDEX: dict[Enum, int] = {e: i for i, e in enumerate(ENUM_MEMBERS)}
+
+# Each of a node's fields is encoded as a run of operands.  An operand is a tag in its low bits and a payload above
+# them: the index of a node, symbol, sort or enum member, or how many of what follows make up a list or dict.
+TAG_BITS = 3
+NODE, NONE, SYM, SORT, LIST, BINDING, DICT, ENUM = range(8)
+
+# In the pos column: a node that wasn't converted from anything at all, as opposed to merely not having a position.
+NO_IVY_NODE = -2
+
+
+class FlatProgram:
+    """A Program laid out as parallel arrays, one entry per node, rather than as a graph of objects.
+
+    Nodes are stored in post-order, so every node comes after its children, and the subtree rooted at node `i` is
+    exactly the nodes `first[i]` through `i`; the root is the last node.  Whole-program analyses can therefore
+    scan the `kind`, `symbol` and `sort` columns linearly, or a single definition's range of them, without
+    building any nodes.  A node that's reachable more than once (see porter.ast.terms.hashcons) is stored once.
+
+    Besides its children, each node's fields are kept as a run of `operands` (see the tags above), from which
+    node() rebuilds it."""
+
+    symbols: list[str]
+    sorts: list[Sort]
+    positions: list[Optional[Position]]
+
+    kind: array      # Index into NODE_KINDS.
+    symbol: array    # The node's first string field (its rep, relsym, op, ...) as an index into symbols, or -1.
+    sort: array      # Index into sorts, or -1.
+    pos: array       # Index into positions, -1 if it has none, or NO_IVY_NODE.
+    first: array     # Where the node's subtree begins.
+    operand_start: array  # Where the node's operands begin; one longer than the others, so they also end.
+    operands: array
+
+    def __init__(self):
+        self.symbols = []
+        self.sorts = []
+        self.positions = []
+        self.kind = array("B")
+        self.symbol = array("i")
+        self.sort = array("i")
+        self.pos = array("i")
+        self.first = array("i")
+        self.operand_start = array("i", [0])
+        self.operands = array("i")
+        self._decoded: dict[int, AST] = {}
+
+    def __len__(self):
+        return len(self.kind)
+
+    @property
+    def root(self) -> int:
+        return len(self) - 1
+
+    # Encoding
+
+    @staticmethod
+    def from_program(prog: Program) -> "FlatProgram":
+        return _Encoder().encode(prog)
+
+    # Queries
+
+    def kind_of(self, i: int) -> type:
+        return NODE_KINDS[self.kind[i]]
+
+    def name(self, i: int) -> Optional[str]:
+        sym = self.symbol[i]
+        return None if sym < 0 else self.symbols[sym]
+
+    def subtree(self, i: int) -> range:
+        "The nodes of the subtree rooted at `i`, other than those shared with an earlier subtree."
+        return range(self.first[i], i + 1)
+
+    def of_kind(self, cls: type, within: Optional[range] = None) -> Iterator[int]:
+        "Every node of the given kind (exactly, not a subclass of it), optionally just those in some range of nodes."
+        k = KIND_OF[cls]
+        for i in within if within is not None else range(len(self)):
+            if self.kind[i] == k:
+                yield i
+
+    def children(self, i: int) -> list[int]:
+        return [op >> TAG_BITS for op in self._operands(i) if op & ((1 << TAG_BITS) - 1) == NODE]
+
+    def _operands(self, i: int) -> array:
+        return self.operands[self.operand_start[i]:self.operand_start[i + 1]]
+
+    # Decoding
+
+    def to_program(self) -> Program:
+        ret = self.node(self.root)
+        assert isinstance(ret, Program)
+        return ret
+
+    def node(self, i: int) -> AST:
+        "The node at index `i`, building it (and any of its subtree that hasn't been already) if need be."
+        hit = self._decoded.get(i)
+        if hit is not None:
+            return hit
+
+        stack = [i]
+        while stack:
+            curr = stack[-1]
+            if curr in self._decoded:
+                stack.pop()
+                continue
+            pending = [c for c in self.children(curr) if c not in self._decoded]
+            if pending:
+                stack.extend(pending)
+                continue
+            self._decoded[curr] = self._build(curr)
+            stack.pop()
+        return self._decoded[i]
+
+    def _build(self, i: int) -> AST:
+        ops = self._operands(i)
+        cursor = 0
+
+        def operand() -> Any:
+            nonlocal cursor
+            op = ops[cursor]
+            cursor += 1
+            tag, payload = op & ((1 << TAG_BITS) - 1), op >> TAG_BITS
+            if tag == NODE:
+                return self._decoded[payload]
+            elif tag == NONE:
+                return None
+            elif tag == SYM:
+                return self.symbols[payload]
+            elif tag == SORT:
+                return self.sorts[payload]
+            elif tag == LIST:
+                return [operand() for _ in range(payload)]
+            elif tag == BINDING:
+                name = operand()
+                return Binding(name, operand())
+            elif tag == DICT:
+                ret = {}
+                for _ in range(payload):
+                    k = operand()
+                    ret[k] = operand()
+                return ret
+            else:
+                return ENUM_MEMBERS[payload]
+
+        cls = self.kind_of(i)
+        fields = [f for f in dataclasses.fields(cls) if f.init and not f.name.startswith("_")]
+        args = [operand() for _ in fields]
+
+        sort = None if self.sort[i] < 0 else self.sorts[self.sort[i]]
+        if self.pos[i] == NO_IVY_NODE:
+            ivy_node = None
+        else:
+            ivy_node = Detached(None if self.pos[i] < 0 else self.positions[self.pos[i]], sort)
+        ret = cls(ivy_node, *args)
+        # Passes sometimes give a node a sort of its own, which may not be what its Ivy node would have told us.
+        ret._sort = sort
+        return ret
+
+
+class _Encoder:
+    "Lays out a Program's nodes in a FlatProgram, interning its symbols, sorts and positions as it goes."
+
+    def __init__(self):
+        self.flat = FlatProgram()
+        self.symbol_ids: dict[str, int] = {}
+        self.sort_ids: dict[Sort, int] = {}
+        self.position_ids: dict[Position, int] = {}
+        self.node_ids: dict[int, int] = {}
+        # Keeps every node we've given an index alive, so that their ids can't be reused while we're encoding.
+        self.seen: list[AST] = []
+
+    def encode(self, prog: Program) -> FlatProgram:
+        # An explicit post-order walk: a node is visited once to push its children and a second time, once they
+        # have all been laid out, to lay it out in turn.
+        stack: list[tuple[AST, bool]] = [(prog, False)]
+        firsts: list[int] = []
+        while stack:
+            node, expanded = stack.pop()
+            if not expanded:
+                if id(node) in self.node_ids:
+                    continue
+                firsts.append(len(self.flat))
+                stack.append((node, True))
+                for child in reversed(list(_child_nodes(node))):
+                    if id(child) not in self.node_ids:
+                        stack.append((child, False))
+            else:
+                self.lay_out(node, firsts.pop())
+        return self.flat
+
+    def lay_out(self, node: AST, first: int):
+        flat = self.flat
+        cls = type(node)
+        if cls not in KIND_OF:
+            raise Exception(f"Can't flatten a {cls.__name__}")
+
+        self.node_ids[id(node)] = len(flat)
+        self.seen.append(node)
+
+        flat.kind.append(KIND_OF[cls])
+        flat.first.append(first)
+
+        detached = node.detached()
+        if detached is None:
+            flat.pos.append(NO_IVY_NODE)
+        elif detached.pos is None:
+            flat.pos.append(-1)
+        else:
+            flat.pos.append(self.intern(self.position_ids, flat.positions, detached.pos))
+        flat.sort.append(-1 if node.sort() is None else self.intern(self.sort_ids, flat.sorts, node.sort()))
+
+        symbol = -1
+        for f in dataclasses.fields(node):
+            if f.name.startswith("_"):
+                continue
+            val = getattr(node, f.name)
+            if symbol < 0 and isinstance(val, str):
+                symbol = self.intern(self.symbol_ids, flat.symbols, val)
+            self.operand(val)
+        flat.symbol.append(symbol)
+        flat.operand_start.append(len(flat.operands))
+
+    def operand(self, val):
+        ops = self.flat.operands
+        if isinstance(val, AST):
+            ops.append(self.node_ids[id(val)] << TAG_BITS | NODE)
+        elif val is None:
+            ops.append(NONE)
+        elif isinstance(val, str):
+            ops.append(self.intern(self.symbol_ids, self.flat.symbols, val) << TAG_BITS | SYM)
+        elif isinstance(val, Sort):
+            ops.append(self.intern(self.sort_ids, self.flat.sorts, val) << TAG_BITS | SORT)
+        elif isinstance(val, list):
+            ops.append(len(val) << TAG_BITS | LIST)
+            for v in val:
+                self.operand(v)
+        elif isinstance(val, Binding):
+            ops.append(BINDING)
+            self.operand(val.name)
+            self.operand(val.decl)
+        elif isinstance(val, dict):
+            ops.append(len(val) << TAG_BITS | DICT)
+            for k, v in val.items():
+                self.operand(k)
+                self.operand(v)
+        elif isinstance(val, Enum) and val in ENUM_INDEX:
+            ops.append(ENUM_INDEX[val] << TAG_BITS | ENUM)
+        else:
+            raise Exception(f"Can't flatten a field holding {val!r}")
+
+    @staticmethod
+    def intern(ids: dict, table: list, val) -> int:
+        ret = ids.get(val)
+        if ret is None:
+            ret = ids[val] = len(table)
+            table.append(val)
+        return ret
+
+
+def _child_nodes(node: AST) -> Iterator[AST]:
+    "The nodes directly beneath `node`, in field order."
+    worklist: list = [getattr(node, f.name) for f in dataclasses.fields(node) if not f.name.startswith("_")]
+    worklist.reverse()
+    while worklist:
+        curr = worklist.pop()
+        if isinstance(curr, AST):
+            yield curr
+        elif isinstance(curr, Binding):
+            worklist.append(curr.decl)
+        elif isinstance(curr, list):
+            worklist.extend(reversed(curr))
+        elif isinstance(curr, dict):
+            worklist.extend(reversed(list(curr.values())))
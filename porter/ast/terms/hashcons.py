@@ -0,0 +1,63 @@
+import dataclasses
+
+from porter.ast import AST, Binding
+from porter.ast.terms import Expr, NativeExpr
+
+from typing import Any, Optional
+
+
+def structural_key(node: Expr) -> tuple:
+    """A hashable summary of an expression: its node type, its sort, and its fields, with each subterm standing in
+    by its identity.  Two expressions whose subterms are already shared have the same key exactly when they're the
+    same expression, modulo where in the source they came from."""
+    ret: list[Any] = [type(node), node.sort()]
+    for f in dataclasses.fields(node):
+        if not f.name.startswith("_"):
+            ret.append(_key_part(getattr(node, f.name)))
+    return tuple(ret)
+
+
+def _key_part(val) -> Any:
+    if isinstance(val, AST):
+        return id(val)
+    if isinstance(val, Binding):
+        return val.name, _key_part(val.decl)
+    if isinstance(val, list):
+        return tuple(_key_part(v) for v in val)
+    return val
+
+
+class HashConser:
+    """Hands back one node for each distinct expression that it's shown, so that an expression that appears
+    many times over in a program is only held in memory once.  Nodes have to be shown to it bottom-up: an
+    expression's subterms need to have been through the same HashConser before the expression itself has.
+
+    The shared node keeps the source position of whichever occurrence we saw first, so only expressions whose
+    positions never reach the output are shared: actions (Asserts, whose positions we print, among them) aren't
+    expressions, and each conjecture takes its own copy of its formula for its position.  Native code isn't
+    shared either, as it gets rewritten in place according to where it sits in the source.
+
+    While a HashConser is active (that is, inside its `with` block), shims.expr_from_ivy() shares the nodes it
+    builds through it."""
+
+    active: Optional["HashConser"] = None
+
+    # The values are the canonical nodes, which keep the subterms whose ids the keys mention alive.
+    table: dict[tuple, Expr]
+
+    def __init__(self):
+        self.table = {}
+        self.prev = None
+
+    def __enter__(self) -> "HashConser":
+        self.prev = HashConser.active
+        HashConser.active = self
+        return self
+
+    def __exit__(self, *_):
+        HashConser.active = self.prev
+
+    def share(self, node: AST) -> AST:
+        if not isinstance(node, Expr) or isinstance(node, NativeExpr):
+            return node
+        return self.table.setdefault(structural_key(node), node)
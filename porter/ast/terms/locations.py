@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+from porter.ast import AST, subterms
+from porter.ast.terms import ActionDefinition, Program
+
+from typing import Iterator, Union
+
+FileLine = tuple[str, int]
+
+# Which part of a Program a definition comes from, and its name there (for inits, its index).
+Owner = tuple[str, str]
+
+
+@dataclass(slots=True)
+class Site:
+    "A node at some source location, and the definition it's part of."
+    node: AST
+    kind: str  # "action", "function", "conjecture" or "init"
+    name: str
+    defn: AST
+
+
+class LocationIndex:
+    """Finds the nodes of a Program by source location, without walking the whole program each time.
+
+    A node is found at its own position and at each position that that one refers to in turn, so that something
+    instantiated from a module can be looked up by where the module says it is, too.  Files are named by their
+    basename, as with native remappings.
+
+    Lookups are a single dict probe; nothing is checked against the Program as they're made.  The index is instead
+    kept up to date a definition at a time, when told to be: refresh() re-indexes just those definitions that have
+    been added, removed or replaced (as the immutable visitors do) since, and invalidate() one whose nodes have been
+    rewritten in place.  As an analysis of the pass manager's, it's refreshed when a pass that only replaces
+    definitions whole invalidates it, and otherwise built over again."""
+
+    prog: Program
+    sites: dict[FileLine, list[Site]]
+
+    def __init__(self, prog: Program):
+        self.prog = prog
+        self.sites = {}
+        # What we indexed each definition as, and under which locations, so we can tell when it's been replaced.
+        self._indexed: dict[Owner, AST] = {}
+        self._lines: dict[Owner, set[FileLine]] = {}
+        self.refresh()
+
+    def nodes_at(self, file: Union[str, Path], line: int) -> list[AST]:
+        return [site.node for site in self.sites_at(file, line)]
+
+    def actions_at(self, file: Union[str, Path], line: int) -> list[tuple[str, ActionDefinition]]:
+        "The actions with anything at the given location, and their names, each once."
+        ret: dict[str, ActionDefinition] = {}
+        for site in self.sites_at(file, line):
+            if site.kind == "action":
+                assert isinstance(site.defn, ActionDefinition)
+                ret.setdefault(site.name, site.defn)
+        return list(ret.items())
+
+    def sites_at(self, file: Union[str, Path], line: int) -> list[Site]:
+        return list(self.sites.get((Path(file).name, line), []))
+
+    def refresh(self):
+        """Brings the index up to date with which definitions the Program has.  This looks at each of them, but
+        only re-indexes those that have changed."""
+        current = dict(self._definitions())
+        for owner in list(self._indexed):
+            if current.get(owner) is not self._indexed[owner]:
+                self._forget(owner)
+        for owner, defn in current.items():
+            if owner not in self._indexed:
+                self._index(owner, defn)
+
+    def invalidate(self, kind: str, name: str):
+        "Re-indexes a definition, since it's been changed in place."
+        self._forget((kind, name))
+        for owner, defn in self._definitions():
+            if owner == (kind, name):
+                self._index(owner, defn)
+
+    def _definitions(self) -> Iterator[tuple[Owner, AST]]:
+        for b in self.prog.actions:
+            yield ("action", b.name), b.decl
+        for b in self.prog.functions:
+            yield ("function", b.name), b.decl
+        for b in self.prog.conjectures:
+            yield ("conjecture", b.name), b.decl
+        for i, init in enumerate(self.prog.inits):
+            yield ("init", str(i)), init
+
+    def _index(self, owner: Owner, defn: AST):
+        kind, name = owner
+        lines = set()
+        seen: set[int] = set()
+        for node in subterms(defn):
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            site = Site(node, kind, name, defn)
+            for loc in dict.fromkeys(_locations(node)):
+                self.sites.setdefault(loc, []).append(site)
+                lines.add(loc)
+        self._indexed[owner] = defn
+        self._lines[owner] = lines
+
+    def _forget(self, owner: Owner):
+        if self._indexed.pop(owner, None) is None:
+            return
+        for loc in self._lines.pop(owner):
+            remaining = [s for s in self.sites[loc] if (s.kind, s.name) != owner]
+            if remaining:
+                self.sites[loc] = remaining
+            else:
+                del self.sites[loc]
+
+
+def _locations(node: AST) -> Iterator[FileLine]:
+    pos = node.pos()
+    while pos is not None:
+        yield pos.filename.name, pos.line
+        pos = pos.reference
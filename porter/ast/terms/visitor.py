@@ -1,9 +1,11 @@
-from typing import Generic
+from types import GeneratorType
+from typing import Any, Callable, Generator, Generic, Union
 
 from porter.ast import AST
 from porter.ast.sorts import Bool, Number
 from porter.ast.sorts.visitor import Visitor as SortVisitor
 from porter.ast.terms import *
+from porter.ast.terms.env import Env
 
 T = TypeVar("T")
 
@@ -16,6 +18,63 @@ class UnimplementedASTNodeHandler(Exception):
         return f"Unimplemented AST visitor for {self.cls.__module__}.{self.cls.__name__}"
 
 
+# Visiting a node with children is a generator, which yields each child to be visited in turn, is sent back what
+# visiting it returned, and finally returns what visiting the node itself does.  Visitor._visit() drives these.
+Visit = Generator[AST, Any, T]
+
+
+def each(nodes) -> Generator[AST, Any, list]:
+    "Visits each of `nodes` in turn, for a _visit_* method to `yield from`."
+    ret = []
+    for node in nodes:
+        ret.append((yield node))
+    return ret
+
+
+# How each kind of node is visited, and the hooks through which a visitor hears about it.
+NODE_HOOKS: dict[type, tuple[str, tuple[str, ...]]] = {
+    Apply: ("_visit_apply", ("_begin_apply", "_finish_apply", "_identifier")),
+    BinOp: ("_visit_binop", ("_begin_binop", "_finish_binop")),
+    Constant: ("_visit_constant", ("_constant", "_identifier")),
+    Var: ("_visit_var", ("_var", "_identifier")),
+    Exists: ("_visit_exists", ("_begin_exists", "_finish_exists")),
+    FieldAccess: ("_visit_field_access", ("_begin_field_access", "_finish_field_access", "_identifier")),
+    Forall: ("_visit_forall", ("_begin_forall", "_finish_forall")),
+    Ite: ("_visit_ite", ("_begin_ite", "_finish_ite")),
+    NativeExpr: ("_visit_native_expr", ("_begin_native_expr", "_finish_native_expr")),
+    Some: ("_visit_some", ("_begin_some", "_finish_some")),
+    UnOp: ("_visit_unop", ("_begin_unop", "_finish_unop")),
+
+    Assert: ("_visit_assert", ("_begin_assert", "_finish_assert")),
+    Assign: ("_visit_assign", ("_begin_assign", "_finish_assign")),
+    Assume: ("_visit_assume", ("_begin_assume", "_finish_assume")),
+    Call: ("_visit_call", ("_begin_call", "_finish_call")),
+    Debug: ("_visit_debug", ("_begin_debug", "_finish_debug")),
+    Ensures: ("_visit_ensures", ("_begin_ensures", "_finish_ensures")),
+    Havok: ("_visit_havok", ("_begin_havok", "_finish_havok")),
+    If: ("_visit_if", ("_begin_if", "_finish_if")),
+    Init: ("_visit_init", ("_begin_init", "_finish_init")),
+    Let: ("_visit_let", ("_begin_let", "_finish_let")),
+    LogicalAssign: ("_visit_logical_assign", ("_begin_logical_assign", "_finish_logical_assign", "_identifier")),
+    NativeAct: ("_visit_native_action", ("_begin_native_action", "_finish_native_action")),
+    Requires: ("_visit_requires", ("_begin_requires", "_finish_requires")),
+    Sequence: ("_visit_sequence", ("_begin_sequence", "_finish_sequence")),
+    While: ("_visit_while", ("_begin_while", "_finish_while")),
+}
+
+EXPR_KINDS = (Apply, BinOp, Constant, Var, Exists, FieldAccess, Forall, Ite, NativeExpr, Some, UnOp)
+
+# The kinds of node that can turn up anywhere beneath each kind of node.
+BENEATH: dict[type, tuple[type, ...]] = {}
+for kind in NODE_HOOKS:
+    if kind in (Constant, Var):
+        BENEATH[kind] = ()
+    elif kind in (If, Init, Let, Sequence, While):
+        BENEATH[kind] = tuple(NODE_HOOKS)
+    else:
+        BENEATH[kind] = EXPR_KINDS
+
+
 # noinspection PyMethodMayBeStatic,PyShadowingBuiltins
 class Visitor(Generic[T]):
     # Technically the Ivy program should give us these trivial sorts too, but manually inserting them here
@@ -29,12 +88,28 @@ class Visitor(Generic[T]):
     actions: list[Binding[T]]
     functions: list[Binding[T]]
 
-    scopes: list[list[str]] = []
+    # The names bound around the node being visited, and their sorts.  Every visitor gets its own, even those
+    # whose __init__ doesn't call ours.
+    env: Env
+
+    # Which method visits each kind of node.  Each subclass gets its own, built once when the class is.
+    _dispatch: dict[type, Callable[["Visitor", Any], Any]]
+
+    def __new__(cls, *args, **kwargs):
+        self = super().__new__(cls)
+        self.env = Env()
+        return self
 
-    def _in_scope(self, v: str):
-        for scope in self.scopes:
-            if v in scope: return True
-        return False
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = cls._dispatch_table()
+
+    @classmethod
+    def _dispatch_table(cls) -> dict[type, Callable[["Visitor", Any], Any]]:
+        return {kind: getattr(cls, visit) for kind, (visit, _hooks) in NODE_HOOKS.items()}
+
+    def _in_scope(self, v: str) -> bool:
+        return v in self.env
 
     @staticmethod
     def visit_program_sorts(prog: Program, visitor: SortVisitor[Sort]):
@@ -71,21 +146,27 @@ class Visitor(Generic[T]):
                 continue
 
             body = self.visit_action(action.body)
-            self.scopes.append([name])
+            outer = self.env
+            self.env = outer.bind(name, None)
             self.actions.append(Binding(name, self._finish_action_def(name, action, body)))
-            self.scopes.pop()
+            self.env = outer
 
         self.functions = []
         for binding in prog.functions:
             name = binding.name
             func = binding.decl
 
-            self._begin_function_def(name, func)
+            bret = self._begin_function_def(name, func)
+            if bret is not None:
+                self.functions.append(bret)
+                continue
+
             body = self.visit_expr(func.body)
 
-            self.scopes.append([name])
+            outer = self.env
+            self.env = outer.bind(name, None)
             self.functions.append(Binding(name, self._finish_function_def(name, func, body)))
-            self.scopes.pop()
+            self.env = outer
 
     def _begin_program(self, prog: Program) -> Optional[T]:
         pass
@@ -113,80 +194,123 @@ class Visitor(Generic[T]):
     # Expressions
 
     def visit_expr(self, node: Expr) -> T:
-        match node:
-            case Apply(_, relsym, args):
-                bret = self._begin_apply(node)
-                if bret is not None: return bret
-
-                relsym = self._identifier(relsym)
-                args = [self.visit_expr(arg) for arg in args]
-                return self._finish_apply(node, relsym, args)
-            case BinOp(_, lhs, _op, rhs):
-                bret = self._begin_binop(node)
-                if bret is not None: return bret
-
-                lhs_ret = self.visit_expr(lhs)
-                rhs_ret = self.visit_expr(rhs)
-                return self._finish_binop(node, lhs_ret, rhs_ret)
-            case Constant(_, _):
-                return self._constant(node)
-            case Var(_, _):
-                return self._var(node)
-            case Exists(_, vardecls, expr):
-                bret = self._begin_exists(node)
-                if bret is not None: return bret
-
-                self.scopes.append([b.name for b in vardecls])
-                expr = self.visit_expr(expr)
-                ret = self._finish_exists(node, expr)
-                self.scopes.pop()
-                return ret
-            case FieldAccess(_, struct, field_name):
-                bret = self._begin_field_access(node)
-                if bret is not None:
-                    return bret
-                struct_t = self.visit_expr(struct)
-                field_name_t = self._identifier(field_name)
-                return self._finish_field_access(node, struct_t, field_name_t)
-            case Forall(_, vardecls, expr):
-                bret = self._begin_forall(node)
-                if bret is not None: return bret
-
-                self.scopes.append([b.name for b in vardecls])
-                expr = self.visit_expr(expr)
-                ret = self._finish_forall(node, expr)
-                self.scopes.pop()
-                return ret
-            case Ite(_, test, then, els):
-                bret = self._begin_ite(node)
-                if bret is not None: return bret
-
-                test = self.visit_expr(test)
-                then = self.visit_expr(then)
-                els = self.visit_expr(els)
-                return self._finish_ite(node, test, then, els)
-            case NativeExpr(_, _lang, _fmt, args):
-                bret = self._begin_native_expr(node)
-                if bret is not None: return bret
-
-                args = [self.visit_expr(arg) for arg in args]
-                return self._finish_native_expr(node, args)
-            case Some(_, vardecls, fmla, _strat):
-                bret = self._begin_some(node)
-                if bret is not None: return bret
-
-                self.scopes.append([b.name for b in vardecls])
-                fmla = self.visit_expr(fmla)
-                ret = self._finish_some(node, fmla)
-                self.scopes.pop()
-                return ret
-            case UnOp(_, _op, expr):
-                bret = self._begin_unop(node)
-                if bret is not None: return bret
-
-                expr = self.visit_expr(expr)
-                return self._finish_unop(node, expr)
-        raise Exception(f"TODO: {node}")
+        return self._visit(node)
+
+    def _visit(self, node: AST) -> T:
+        # Drive the _visit_* generators from an explicit stack, as shims.convert() does, so that how deeply a
+        # program nests is bounded by memory rather than by the Python stack.  Hooks run in the same order as
+        # they would if we recursed: a node's _begin hook on the way down and its _finish hook once all its
+        # children are done, with its scope pushed in between.
+        ret = self._start(node)
+        if not isinstance(ret, GeneratorType):
+            return ret
+
+        stack = [ret]
+        ret = None
+        while stack:
+            try:
+                child = stack[-1].send(ret)
+            except StopIteration as done:
+                stack.pop()
+                ret = done.value
+                continue
+            ret = self._start(child)
+            if isinstance(ret, GeneratorType):
+                stack.append(ret)
+                ret = None
+        return ret
+
+    def _start(self, node: AST) -> Union[T, Visit[T]]:
+        visit = self._dispatch.get(type(node))
+        if visit is None:
+            raise Exception(f"TODO: {node}")
+        return visit(self, node)
+
+    def _visit_apply(self, node: Apply) -> Visit[T]:
+        bret = self._begin_apply(node)
+        if bret is not None: return bret
+
+        relsym = self._identifier(node.relsym)
+        args = yield from each(node.args)
+        return self._finish_apply(node, relsym, args)
+
+    def _visit_binop(self, node: BinOp) -> Visit[T]:
+        bret = self._begin_binop(node)
+        if bret is not None: return bret
+
+        lhs_ret = yield node.lhs
+        rhs_ret = yield node.rhs
+        return self._finish_binop(node, lhs_ret, rhs_ret)
+
+    def _visit_constant(self, node: Constant) -> T:
+        return self._constant(node)
+
+    def _visit_var(self, node: Var) -> T:
+        return self._var(node)
+
+    def _visit_exists(self, node: Exists) -> Visit[T]:
+        bret = self._begin_exists(node)
+        if bret is not None: return bret
+
+        outer = self.env
+        self.env = outer.bind_all(node.vars)
+        expr = yield node.expr
+        ret = self._finish_exists(node, expr)
+        self.env = outer
+        return ret
+
+    def _visit_field_access(self, node: FieldAccess) -> Visit[T]:
+        bret = self._begin_field_access(node)
+        if bret is not None:
+            return bret
+        struct_t = yield node.struct
+        field_name_t = self._identifier(node.fname)
+        return self._finish_field_access(node, struct_t, field_name_t)
+
+    def _visit_forall(self, node: Forall) -> Visit[T]:
+        bret = self._begin_forall(node)
+        if bret is not None: return bret
+
+        outer = self.env
+        self.env = outer.bind_all(node.vars)
+        expr = yield node.expr
+        ret = self._finish_forall(node, expr)
+        self.env = outer
+        return ret
+
+    def _visit_ite(self, node: Ite) -> Visit[T]:
+        bret = self._begin_ite(node)
+        if bret is not None: return bret
+
+        test = yield node.test
+        then = yield node.then
+        els = yield node.els
+        return self._finish_ite(node, test, then, els)
+
+    def _visit_native_expr(self, node: NativeExpr) -> Visit[T]:
+        bret = self._begin_native_expr(node)
+        if bret is not None: return bret
+
+        args = yield from each(node.args)
+        return self._finish_native_expr(node, args)
+
+    def _visit_some(self, node: Some) -> Visit[T]:
+        bret = self._begin_some(node)
+        if bret is not None: return bret
+
+        outer = self.env
+        self.env = outer.bind_all(node.vars)
+        fmla = yield node.fmla
+        ret = self._finish_some(node, fmla)
+        self.env = outer
+        return ret
+
+    def _visit_unop(self, node: UnOp) -> Visit[T]:
+        bret = self._begin_unop(node)
+        if bret is not None: return bret
+
+        expr = yield node.expr
+        return self._finish_unop(node, expr)
 
     def _identifier(self, s: str) -> T:
         raise UnimplementedASTNodeHandler(str)
@@ -254,114 +378,134 @@ class Visitor(Generic[T]):
     # Actions
 
     def visit_action(self, node: Action) -> T:
-        match node:
-            case Assert(_, pred):
-                bret = self._begin_assert(node)
-                if bret is not None: return bret
-
-                pred = self.visit_expr(pred)
-                return self._finish_assert(node, pred)
-            case Assign(_, lhs, rhs):
-                bret = self._begin_assign(node)
-                if bret is not None: return bret
-
-                lhs = self.visit_expr(lhs)
-                rhs = self.visit_expr(rhs)
-                return self._finish_assign(node, lhs, rhs)
-            case Assume(_, pred):
-                bret = self._begin_assume(node)
-                if bret is not None: return bret
-
-                pred = self.visit_expr(pred)
-                return self._finish_assume(node, pred)
-            case Call(_, app):
-                bret = self._begin_call(node)
-                if bret is not None: return bret
-
-                app = self.visit_expr(app)
-                return self._finish_call(node, app)
-            case Debug(_, _msg, args):
-                bret = self._begin_debug(node)
-                if bret is not None: return bret
-
-                args = [Binding(b.name, self.visit_expr(b.decl)) for b in args]
-                return self._finish_debug(node, args)
-            case Ensures(_, pred):
-                bret = self._begin_ensures(node)
-                if bret is not None: return bret
-
-                pred = self.visit_expr(pred)
-                return self._finish_ensures(node, pred)
-            case Havok(_, modifies):
-                bret = self._begin_havok(node)
-                if bret is not None: return bret
-
-                modifies = [self.visit_expr(e) for e in modifies]
-                return self._finish_havok(node, modifies)
-            case If(_, test, then, els):
-                bret = self._begin_if(node)
-                if bret is not None: return bret
-
-                test = self.visit_expr(test)
-                then = self.visit_action(then)
-                if els is not None:
-                    els = self.visit_action(els)
-                return self._finish_if(node, test, then, els)
-            case Init(_, params, act):
-                bret = self._begin_init(node)
-                if bret is not None: return bret
-
-                self.scopes.append([b.name for b in params])
-                act = self.visit_action(act) 
-                ret = self._finish_init(node, act)
-                self.scopes.pop()
-                return ret
-            case Let(_, vardecls, scope):
-                bret = self._begin_let(node)
-                if bret is not None: return bret
-
-                self.scopes.append([b.name for b in vardecls])
-
-                scope = self.visit_action(scope)
-                ret = self._finish_let(node, scope)
-                self.scopes.pop()
-                return ret
-            case LogicalAssign(_, relsym, args, assignee):
-                bret = self._begin_logical_assign(node)
-                if bret is not None: return bret
-
-                relsym = self._identifier(relsym)
-                args = [self.visit_expr(a) for a in args]
-                assignee = self.visit_expr(assignee)
-                return self._finish_logical_assign(node, relsym, args, assignee)
-            case NativeAct(_, _lang, _fmt, args):
-                bret = self._begin_native_action(node)
-                if bret is not None: return bret
-
-                args = [self.visit_expr(arg) for arg in args]
-                return self._finish_native_action(node, args)
-            case Requires(_, pred):
-                bret = self._begin_requires(node)
-                if bret is not None: return bret
-
-                pred = self.visit_expr(pred)
-                return self._finish_requires(node, pred)
-            case Sequence(_, stmts):
-                bret = self._begin_sequence(node)
-                if bret is not None: return bret
-
-                stmts = [self.visit_action(stmt) for stmt in stmts]
-                return self._finish_sequence(node, stmts)
-            case While(_, test, decreases, do):
-                bret = self._begin_while(node)
-                if bret is not None: return bret
-
-                test = self.visit_expr(test)
-                if decreases is not None:
-                    decreases = self.visit_expr(decreases)
-                do = self.visit_action(do)
-                return self._finish_while(node, test, decreases, do)
-        raise Exception(f"TODO: {node}")
+        return self._visit(node)
+
+    def _visit_assert(self, node: Assert) -> Visit[T]:
+        bret = self._begin_assert(node)
+        if bret is not None: return bret
+
+        pred = yield node.pred
+        return self._finish_assert(node, pred)
+
+    def _visit_assign(self, node: Assign) -> Visit[T]:
+        bret = self._begin_assign(node)
+        if bret is not None: return bret
+
+        lhs = yield node.lhs
+        rhs = yield node.rhs
+        return self._finish_assign(node, lhs, rhs)
+
+    def _visit_assume(self, node: Assume) -> Visit[T]:
+        bret = self._begin_assume(node)
+        if bret is not None: return bret
+
+        pred = yield node.pred
+        return self._finish_assume(node, pred)
+
+    def _visit_call(self, node: Call) -> Visit[T]:
+        bret = self._begin_call(node)
+        if bret is not None: return bret
+
+        app = yield node.app
+        return self._finish_call(node, app)
+
+    def _visit_debug(self, node: Debug) -> Visit[T]:
+        bret = self._begin_debug(node)
+        if bret is not None: return bret
+
+        args = []
+        for b in node.args:
+            args.append(Binding(b.name, (yield b.decl)))
+        return self._finish_debug(node, args)
+
+    def _visit_ensures(self, node: Ensures) -> Visit[T]:
+        bret = self._begin_ensures(node)
+        if bret is not None: return bret
+
+        pred = yield node.pred
+        return self._finish_ensures(node, pred)
+
+    def _visit_havok(self, node: Havok) -> Visit[T]:
+        bret = self._begin_havok(node)
+        if bret is not None: return bret
+
+        modifies = yield from each(node.modifies)
+        return self._finish_havok(node, modifies)
+
+    def _visit_if(self, node: If) -> Visit[T]:
+        bret = self._begin_if(node)
+        if bret is not None: return bret
+
+        test = yield node.test
+        then = yield node.then
+        els = node.els
+        if els is not None:
+            els = yield els
+        return self._finish_if(node, test, then, els)
+
+    def _visit_init(self, node: Init) -> Visit[T]:
+        bret = self._begin_init(node)
+        if bret is not None: return bret
+
+        outer = self.env
+        self.env = outer.bind_all(node.params)
+        act = yield node.act
+        ret = self._finish_init(node, act)
+        self.env = outer
+        return ret
+
+    def _visit_let(self, node: Let) -> Visit[T]:
+        bret = self._begin_let(node)
+        if bret is not None: return bret
+
+        outer = self.env
+        self.env = outer.bind_all(node.vardecls)
+
+        scope = yield node.scope
+        ret = self._finish_let(node, scope)
+        self.env = outer
+        return ret
+
+    def _visit_logical_assign(self, node: LogicalAssign) -> Visit[T]:
+        bret = self._begin_logical_assign(node)
+        if bret is not None: return bret
+
+        relsym = self._identifier(node.relsym)
+        args = yield from each(node.vars)
+        assignee = yield node.assign
+        return self._finish_logical_assign(node, relsym, args, assignee)
+
+    def _visit_native_action(self, node: NativeAct) -> Visit[T]:
+        bret = self._begin_native_action(node)
+        if bret is not None: return bret
+
+        args = yield from each(node.args)
+        return self._finish_native_action(node, args)
+
+    def _visit_requires(self, node: Requires) -> Visit[T]:
+        bret = self._begin_requires(node)
+        if bret is not None: return bret
+
+        pred = yield node.pred
+        return self._finish_requires(node, pred)
+
+    def _visit_sequence(self, node: Sequence) -> Visit[T]:
+        bret = self._begin_sequence(node)
+        if bret is not None: return bret
+
+        stmts = yield from each(node.stmts)
+        return self._finish_sequence(node, stmts)
+
+    def _visit_while(self, node: While) -> Visit[T]:
+        bret = self._begin_while(node)
+        if bret is not None: return bret
+
+        test = yield node.test
+        decreases = node.decreases
+        if decreases is not None:
+            decreases = yield decreases
+        do = yield node.do
+        return self._finish_while(node, test, decreases, do)
 
     def _begin_assert(self, act: Assert) -> Optional[T]:
         pass
@@ -454,6 +598,9 @@ class Visitor(Generic[T]):
         raise UnimplementedASTNodeHandler(While)
 
 
+Visitor._dispatch = Visitor._dispatch_table()
+
+
 class ImmutVisitor(Visitor[AST]):
     """ A base class for immutable visitors, that consume and produce a new tree.
     Since we require stronger typing guarantees than each T being an AST, we fall back
@@ -641,7 +788,31 @@ class ImmutVisitor(Visitor[AST]):
 
 
 class MutVisitor(Visitor[None]):
-    " A base class for mutating visitors, where all operations are procedures and default to no-ops."
+    """ A base class for mutating visitors, where all operations are procedures and default to no-ops.
+
+    Since there's nothing to be gained from visiting a node when neither it nor anything that could be beneath it
+    has a hook that does something, a subclass's dispatch table skips straight over those."""
+
+    @classmethod
+    def _dispatch_table(cls) -> dict[type, Callable[["Visitor", Any], Any]]:
+        ret = super()._dispatch_table()
+        # The class that introduced _skip is MutVisitor itself, whose hooks are the no-ops we're comparing against.
+        base = next(c for c in cls.__mro__ if "_skip" in c.__dict__)
+        if base is cls:
+            return ret
+
+        def overridden(kind: type) -> bool:
+            visit, hooks = NODE_HOOKS[kind]
+            return any(getattr(cls, h) is not getattr(base, h) for h in (visit,) + hooks)
+
+        for kind in ret:
+            if not any(overridden(k) for k in (kind,) + BENEATH[kind]):
+                ret[kind] = base._skip
+        return ret
+
+    @staticmethod
+    def _skip(_self, _node) -> None:
+        return None
 
     # Expressions
 
@@ -726,6 +897,154 @@ class MutVisitor(Visitor[None]):
         pass
 
 
+class FusedVisitor(MutVisitor):
+    """Runs several independent MutVisitors over a program in a single traversal, rather than one apiece.
+
+    Each hook is handed on to each of the passes in the order they were given, so any one node sees the passes
+    in that order, as it would if they'd run one after another; a pass mustn't depend on a later node having
+    been seen by an earlier pass, though.  A pass whose _begin hook returns something isn't told about that
+    node's subtree, just as if it ran alone, while the others carry on into it.  A kind of node is only visited
+    if one of the passes would have, and only handed to those passes.  The passes may only override hooks, not
+    the _visit_* methods themselves."""
+
+    passes: list[MutVisitor]
+
+    def __init__(self, *passes: MutVisitor):
+        self.passes = list(passes)
+        self.env = self.env
+        # Which passes we've stopped telling about the subtree we're in, and the nodes at which we stopped them.
+        self._muted: set[int] = set()
+        self._muted_at: list[tuple[Any, list[MutVisitor]]] = []
+
+        self._interested = {kind: [p for p in passes if p._dispatch[kind] is not MutVisitor._skip]
+                            for kind in NODE_HOOKS}
+        self._dispatch = {kind: getattr(Visitor, visit) if self._interested[kind] else MutVisitor._skip
+                          for kind, (visit, _hooks) in NODE_HOOKS.items()}
+
+    @property
+    def env(self) -> Env:
+        return self._env
+
+    @env.setter
+    def env(self, env: Env):
+        # The passes' hooks look in their own env, so keep them all in step with ours.  (Visitor.__new__ gives us our
+        # first before we have any passes, so __init__ hands it on to them.)
+        self._env = env
+        for p in getattr(self, "passes", ()):
+            p.env = env
+
+    def visit_program(self, prog: Program):
+        # As Visitor.visit_program, except that each pass collects the actions and functions it would have alone,
+        # rather than what we would.
+        self._begin_program(prog)
+
+        self.sorts = prog.sorts
+        self.individuals = prog.individuals
+        for p in self.passes:
+            p.sorts, p.individuals = prog.sorts, prog.individuals
+            p.actions, p.functions = [], []
+        self.inits = [self.visit_action(a) for a in prog.inits]
+        for p in self.passes:
+            p.inits = list(self.inits)
+
+        for binding in prog.actions:
+            self._visit_definition(binding.name, binding.decl, "action_def")
+        for binding in prog.functions:
+            self._visit_definition(binding.name, binding.decl, "function_def")
+
+    def _visit_definition(self, name: str, defn: Union[ActionDefinition, FunctionDefinition], kind: str):
+        listening = []
+        for p in self.passes:
+            defns = p.actions if kind == "action_def" else p.functions
+            bret = getattr(p, f"_begin_{kind}")(name, defn)
+            if bret is not None:
+                defns.append(bret)
+            else:
+                listening.append(p)
+        if not listening:
+            return
+
+        muted = [id(p) for p in self.passes if p not in listening]
+        self._muted.update(muted)
+        if isinstance(defn, ActionDefinition):
+            body = self.visit_action(defn.body)
+        else:
+            body = self.visit_expr(defn.body)
+
+        outer = self.env
+        self.env = outer.bind(name, None)
+        for p in listening:
+            defns = p.actions if kind == "action_def" else p.functions
+            defns.append(Binding(name, getattr(p, f"_finish_{kind}")(name, defn, body)))
+        self.env = outer
+        self._muted.difference_update(muted)
+
+    def _listening(self, passes: list[MutVisitor]) -> list[MutVisitor]:
+        if not self._muted:
+            return passes
+        return [p for p in passes if id(p) not in self._muted]
+
+    def _begin(self, passes: list[MutVisitor], hook: str, node, *args) -> Optional[bool]:
+        muted = []
+        listening = self._listening(passes)
+        for p in listening:
+            if getattr(p, hook)(*args, node) is not None:
+                muted.append(p)
+        if not muted:
+            return None
+        if len(muted) == len(listening):
+            # Nobody wants to hear about what's beneath here (the other passes never did), so skip it outright.
+            return True
+        self._muted.update(id(p) for p in muted)
+        self._muted_at.append((node, muted))
+        return None
+
+    def _finish(self, passes: list[MutVisitor], hook: str, node, *args):
+        for p in self._listening(passes):
+            getattr(p, hook)(*args)
+        if self._muted_at and self._muted_at[-1][0] is node:
+            _, muted = self._muted_at.pop()
+            self._muted.difference_update(id(p) for p in muted)
+
+    # Program-level hooks
+
+    def _begin_program(self, prog: Program):
+        for p in self.passes:
+            p._begin_program(prog)
+
+    # Leaves
+
+    def _identifier(self, s: str):
+        for p in self._listening(self.passes):
+            p._identifier(s)
+
+    def _constant(self, c: Constant):
+        for p in self._listening(self._interested[Constant]):
+            p._constant(c)
+
+    def _var(self, v: Var):
+        for p in self._listening(self._interested[Var]):
+            p._var(v)
+
+
+def _fused_hooks(kind: type, begin: str, finish: str):
+    def begin_hook(self: FusedVisitor, node):
+        return self._begin(self._interested[kind], begin, node)
+
+    def finish_hook(self: FusedVisitor, node, *results):
+        self._finish(self._interested[kind], finish, node, node, *results)
+
+    begin_hook.__name__, finish_hook.__name__ = begin, finish
+    return begin_hook, finish_hook
+
+
+# Every other kind of node has a _begin and a _finish hook, which we hand on to each pass in the same way.
+for _kind, (_visit, _hooks) in NODE_HOOKS.items():
+    if _kind not in (Constant, Var):
+        for _hook in _fused_hooks(_kind, _hooks[0], _hooks[1]):
+            setattr(FusedVisitor, _hook.__name__, _hook)
+
+
 class SortVisitorOverTerms(MutVisitor):
     sort_visitor: SortVisitor[Sort]
 
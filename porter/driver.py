@@ -0,0 +1,146 @@
+import functools
+import logging
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+from porter import extraction
+from porter.ast import terms
+from porter.extraction.scala.incremental import DocCache, IncrementalExtractor
+from porter.ivy import includes, shims
+from porter.ivy.cache import ProgramCache, fingerprint
+
+
+def isolates_from_paths(paths: Iterable[Path]) -> list[Path]:
+    "Expands directories into the Ivy files directly inside them."
+    ret = []
+    for path in paths:
+        path = path.absolute()
+        if path.is_dir():
+            ret.extend(sorted(p for p in path.glob("*.ivy") if p.is_file()))
+        else:
+            ret.append(path)
+    return ret
+
+
+def output_path(output_dir: Path, isolate: Path) -> Path:
+    return output_dir / f"{isolate.stem}.scala"
+
+
+def extract_isolate(isolate: Path,
+                    cache: Optional[ProgramCache] = None,
+                    width=200,
+                    backend="scala",
+                    reachable_only=False,
+                    reproducible=False,
+                    hash_cons=False) -> str:
+    """Extracts `isolate`.  If `reproducible`, the output depends only on the contents of the isolate and what it
+    includes (and the options it's extracted with), so an unchanged isolate extracts to identical bytes."""
+    if backend not in extraction.BACKENDS:
+        raise Exception(f"Unknown backend {backend} (expected one of: {', '.join(extraction.BACKENDS)})")
+    prog, stamp = convert(isolate, cache, reachable_only, reproducible, hash_cons)
+    return extraction.BACKENDS[backend](prog, width, stamp=stamp)
+
+
+def convert(isolate: Path,
+            cache: Optional[ProgramCache] = None,
+            reachable_only=False,
+            reproducible=False,
+            hash_cons=False) -> tuple[terms.Program, Optional[str]]:
+    """Converts `isolate`, and if `reproducible`, works out the stamp to extract it with.  That's the same digest
+    that the cache keys the program by, so the isolate and its includes are only hashed the once."""
+    stamp = fingerprint(isolate, *shims.conversion_options(reachable_only, hash_cons)) if reproducible else None
+    return shims.handle_isolate(isolate, cache, reachable_only, hash_cons, key=stamp), stamp
+
+
+def extract_batch(isolates: list[Path],
+                  output_dir: Path,
+                  cache: Optional[ProgramCache] = None,
+                  jobs: int = 1,
+                  reachable_only=False,
+                  reproducible=False,
+                  hash_cons=False) -> list[Path]:
+    """Extracts each isolate, writing one Scala file per isolate into `output_dir`.  Each isolate is compiled
+    into a fresh Ivy module, so nothing leaks from one to the next.
+
+    Ivy keeps its state in process-wide globals, so isolates can't be compiled concurrently within a process;
+    with jobs > 1 we instead shard them across a pool of worker processes, each of which hands back the rendered
+    source.  Outputs are written in the order the isolates were given irrespective of which worker finished
+    first."""
+    outputs = [output_path(output_dir, isolate) for isolate in isolates]
+    if len(set(outputs)) != len(outputs):
+        dups = sorted(set(o.name for o in outputs if outputs.count(o) > 1))
+        raise Exception(f"Several isolates would be extracted to the same file: {', '.join(dups)}")
+
+    extract = functools.partial(extract_isolate, cache=cache, reachable_only=reachable_only, reproducible=reproducible,
+                                hash_cons=hash_cons)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if jobs > 1 and len(isolates) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(isolates))) as pool:
+            extracted = pool.map(extract, isolates)
+            _write_all(isolates, outputs, extracted)
+    else:
+        extracted = (extract(isolate) for isolate in isolates)
+        _write_all(isolates, outputs, extracted)
+    return outputs
+
+
+def _write_all(isolates: list[Path], outputs: list[Path], extracted: Iterable[str]):
+    for isolate, out, source in zip(isolates, outputs, extracted):
+        logging.info(f"Extracted {isolate} to {out}")
+        out.write_text(source + "\n")
+
+
+def extract_incrementally(isolate: Path,
+                          docs: DocCache,
+                          cache: Optional[ProgramCache] = None,
+                          width=200,
+                          reachable_only=False,
+                          reproducible=False,
+                          hash_cons=False) -> str:
+    """Extracts `isolate`, reusing whatever Docs in `docs` are still valid and updating it with the rest."""
+    prog, stamp = convert(isolate, cache, reachable_only, reproducible, hash_cons)
+    extractor = IncrementalExtractor(docs, prog)
+    source = extraction.extract_scala(prog, width, extractor, stamp)
+    docs.retain(extractor.live)
+    logging.info(f"Reused {extractor.hits} of {extractor.hits + extractor.misses} definitions")
+    return source
+
+
+def watch(isolate: Path,
+          output_dir: Optional[Path] = None,
+          cache: Optional[ProgramCache] = None,
+          interval=0.5,
+          reachable_only=False,
+          reproducible=False,
+          hash_cons=False):
+    """Re-extracts `isolate` whenever it, or anything it includes, changes.  Only the definitions that
+    changed are re-extracted; see IncrementalExtractor."""
+    docs = DocCache()
+    seen = None
+    while True:
+        try:
+            snapshot = {f: f.stat().st_mtime_ns for f in [isolate] + includes.transitive_includes(isolate)}
+        except OSError:
+            # Presumably we caught an editor halfway through saving a file.
+            snapshot = None
+
+        if snapshot is not None and snapshot != seen:
+            seen = snapshot
+            try:
+                source = extract_incrementally(isolate, docs, cache, reachable_only=reachable_only,
+                                               reproducible=reproducible, hash_cons=hash_cons)
+            except Exception:
+                logging.exception(f"Extracting {isolate} failed")
+            else:
+                if output_dir is None:
+                    print(source, flush=True)
+                else:
+                    output_dir.mkdir(parents=True, exist_ok=True)
+                    out = output_path(output_dir, isolate)
+                    out.write_text(source + "\n")
+                    logging.info(f"Extracted {isolate} to {out}")
+        time.sleep(interval)
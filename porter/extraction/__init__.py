@@ -1,8 +1,33 @@
+import dataclasses
+
 from porter.ast import terms
 from porter.extraction import scala
 from porter.pp import formatter
 
+from typing import Callable, Optional
+
+
+def in_name_order(prog: terms.Program) -> terms.Program:
+    "`prog`, with its actions and functions in order of name rather than whatever order Ivy produced them in."
+    return dataclasses.replace(prog,
+                               actions=sorted(prog.actions, key=lambda b: b.name),
+                               functions=sorted(prog.functions, key=lambda b: b.name))
 
-def extract_scala(prog: terms.Program, width=200) -> str:
-    doc = scala.extract("PorterIsolate", prog)
+
+def extract_scala(prog: terms.Program,
+                  width=200,
+                  extractor: Optional[scala.Extractor] = None,
+                  stamp: Optional[str] = None) -> str:
+    """Extracts `prog` into Scala source.  Given a `stamp` (a digest of whatever the program was converted from),
+    the output is reproducible: it's headed by the stamp, not the time, and actions and functions appear in
+    order of name.  (Sorts already appear in the order they were declared in.)"""
+    if stamp is not None:
+        prog = in_name_order(prog)
+    doc = scala.extract("PorterIsolate", prog, extractor, stamp)
     return formatter.Naive(width).format(doc).layout()
+
+
+# Each backend takes a Program, the width to lay it out to, and optionally a stamp (see extract_scala()).
+BACKENDS: dict[str, Callable[..., str]] = {
+    "scala": extract_scala,
+}
@@ -1,4 +1,5 @@
 from datetime import datetime
+import functools
 import os
 import subprocess
 
@@ -8,23 +9,37 @@ from .helpers import *
 from porter.ast import terms as astterms
 from ...pp import Nil
 
+from typing import Optional
 
-def header() -> Doc:
+
+@functools.cache
+def porter_commit() -> Optional[str]:
+    "The commit that Porter is running out of, if we can tell.  (We only ask git once per process.)"
     p = os.path.dirname(os.path.realpath(__file__))
-    cwd = os.getcwd()
     try:
-        os.chdir(p)
-        curr_commit = subprocess.check_output("git log --oneline | head -n1", shell=True).strip().decode("utf-8")
-        now = datetime.now().strftime("%d/%m/%Y at %H:%M:%S")
-        return Text(f"/* Autogenerated at {now} at commit {curr_commit} */")
-    except Exception as e:
-        return Text(f"/* Autogenerated ({str(e)}) */")
-    finally:
-        os.chdir(cwd)
-
-
-def extract(isolate_name: str, prog: astterms.Program) -> Doc:
-    extractor = Extractor()
+        return subprocess.check_output(["git", "log", "--oneline", "-n1"], cwd=p).strip().decode("utf-8")
+    except Exception:
+        return None
+
+
+def header(stamp: Optional[str] = None) -> Doc:
+    if stamp is not None:
+        return Text(f"/* Autogenerated from program {stamp} */")
+    now = datetime.now().strftime("%d/%m/%Y at %H:%M:%S")
+    curr_commit = porter_commit()
+    if curr_commit is None:
+        return Text(f"/* Autogenerated at {now} */")
+    return Text(f"/* Autogenerated at {now} at commit {curr_commit} */")
+
+
+def extract(isolate_name: str,
+            prog: astterms.Program,
+            extractor: Optional[Extractor] = None,
+            stamp: Optional[str] = None) -> Doc:
+    """Extracts `prog` into a Scala class.  The output is headed by `stamp` if given, rather than by when (and
+    from which commit) it was extracted."""
+    if extractor is None:
+        extractor = Extractor()
     extractor.visit_program(prog)
 
     sort_declarer = SortDeclaration()
@@ -55,4 +70,4 @@ def extract(isolate_name: str, prog: astterms.Program) -> Doc:
     if len(action_docs) > 0:
         body += utils.join(action_docs, "\n")
 
-    return header() + Line() + Text(f"class {isolate_name}(a: Arbitrary) extends Protocol(a) ") + block(body)
+    return header(stamp) + Line() + Text(f"class {isolate_name}(a: Arbitrary) extends Protocol(a) ") + block(body)
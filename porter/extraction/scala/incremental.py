@@ -0,0 +1,111 @@
+import hashlib
+
+from .terms import Extractor
+
+from porter.ast import AST, Binding, subterms, terms
+from porter.ivy import Position
+from porter.pp import Doc
+
+from typing import Optional
+
+# What sort of definition a Doc was extracted from, and its name.
+DocKey = tuple[str, str]
+
+
+def asserted(node: AST) -> list[Optional[Position]]:
+    "The source position of every assertion in the tree rooted at `node`."
+    return [curr.pos() for curr in subterms(node) if isinstance(curr, terms.Assert)]
+
+
+class DocCache:
+    """The Docs extracted for each action, function and conjecture on an earlier run, each alongside a
+    fingerprint of what it was extracted from."""
+
+    entries: dict[DocKey, tuple[str, Doc]]
+
+    def __init__(self):
+        self.entries = {}
+
+    def lookup(self, key: DocKey, fingerprint: str) -> Optional[Doc]:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != fingerprint:
+            return None
+        return entry[1]
+
+    def store(self, key: DocKey, fingerprint: str, doc: Doc):
+        self.entries[key] = (fingerprint, doc)
+
+    def retain(self, live: set[DocKey]):
+        "Forgets the Docs for definitions that no longer exist."
+        self.entries = {k: v for k, v in self.entries.items() if k in live}
+
+
+class IncrementalExtractor(Extractor):
+    """An Extractor that reuses the Docs from a previous run for definitions that are unchanged since then.
+
+    A definition is unchanged if its structure and the source positions that end up in its Doc are the same
+    (line numbers leak into assertions and conjectures, but nowhere else, so moving a definition around in its
+    file needn't rebuild it), and the program's sorts and individuals, which determine the sorts of its nodes,
+    are the same too."""
+
+    cache: DocCache
+    context: str
+    live: set[DocKey]
+    pending: dict[DocKey, str]
+
+    hits: int
+    misses: int
+
+    def __init__(self, cache: DocCache, prog: terms.Program):
+        self.cache = cache
+        self.context = repr((prog.sorts, prog.individuals))
+        self.live = set()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, defn: AST, printed: list[Optional[Position]]) -> str:
+        h = hashlib.sha256(self.context.encode())
+        h.update(repr(defn).encode())
+        h.update(repr(printed).encode())
+        return h.hexdigest()
+
+    def lookup(self, key: DocKey, defn: AST, printed: list[Optional[Position]]) -> Optional[Doc]:
+        self.live.add(key)
+        fp = self.fingerprint(defn, printed)
+        doc = self.cache.lookup(key, fp)
+        if doc is None:
+            self.misses += 1
+            self.pending[key] = fp
+        else:
+            self.hits += 1
+        return doc
+
+    def store(self, key: DocKey, doc: Doc) -> Doc:
+        self.cache.store(key, self.pending.pop(key), doc)
+        return doc
+
+    def add_conjecture(self, conj: Binding[terms.Expr]) -> Doc:
+        key = ("conjecture", conj.name)
+        doc = self.lookup(key, conj.decl, [conj.decl.pos()])
+        if doc is not None:
+            return doc
+        return self.store(key, super().add_conjecture(conj))
+
+    def _begin_action_def(self, name: str, defn: terms.ActionDefinition) -> Optional[Binding[Doc]]:
+        doc = self.lookup(("action", name), defn, asserted(defn))
+        if doc is not None:
+            return Binding(name, doc)
+        return None
+
+    def _finish_action_def(self, name: str, defn: terms.ActionDefinition, body: Doc) -> Doc:
+        return self.store(("action", name), super()._finish_action_def(name, defn, body))
+
+    def _begin_function_def(self, name: str, defn: terms.FunctionDefinition) -> Optional[Binding[Doc]]:
+        doc = self.lookup(("function", name), defn, asserted(defn))
+        if doc is not None:
+            return Binding(name, doc)
+        return None
+
+    def _finish_function_def(self, name: str, defn: terms.FunctionDefinition, body: Doc) -> Doc:
+        return self.store(("function", name), super()._finish_function_def(name, defn, body))
@@ -3,7 +3,7 @@ from . import helpers as h
 
 from porter.ast import sorts
 
-from porter.ast.sorts.visitor import Visitor as SortVisitor
+from porter.ast.sorts.visitor import Memoized, Visitor as SortVisitor
 
 from porter.ivy import Position
 
@@ -14,7 +14,7 @@ from porter.pp.utils import space, Line, enclosed
 from typing import Optional
 
 
-class DefaultValue(SortVisitor[Doc]):
+class DefaultValue(Memoized[Doc], shared=True):
     "A sensible initializer value for values of a given sort."
 
     def bool(self):
@@ -62,7 +62,7 @@ class DefaultValue(SortVisitor[Doc]):
         return Text("0")
 
 
-class BoxedSort(SortVisitor[Doc]):
+class BoxedSort(Memoized[Doc], shared=True):
     "A reference type for a given sort"
 
     def bool(self):
@@ -97,7 +97,7 @@ class BoxedSort(SortVisitor[Doc]):
         return Text("Integer")
 
 
-class UnboxedSort(SortVisitor[Doc]):
+class UnboxedSort(Memoized[Doc], shared=True):
     "A value type for a given sort."
 
     def bool(self):
@@ -114,7 +114,7 @@ class UnboxedSort(SortVisitor[Doc]):
         return Text(canonicalize_identifier(name))
 
     def _begin_function(self, node: sorts.Function) -> Optional[Doc]:
-        type_args = [self.visit_sort(s) for s in node.domain + [node.range]]
+        type_args = [self.visit_sort(s) for s in (*node.domain, node.range)]
 
         cls = Text("Maps.Map") + Text(str(len(node.domain)))
         return cls + h.typelist(utils.join(type_args, ", "))
@@ -216,7 +216,7 @@ class SortDeclaration(SortVisitor[Doc]):
 
     def _finish_function(self, node: sorts.Function, domain: list[Doc], range: Doc):
         boxed = BoxedSort()
-        type_args = [boxed.visit_sort(s) for s in node.domain + [node.range]]
+        type_args = [boxed.visit_sort(s) for s in (*node.domain, node.range)]
 
         cls = Text("beguine.Maps.Map") + Text(str(len(node.domain)))
         return cls + h.typelist(utils.join(type_args))
@@ -252,7 +252,7 @@ class SortDeclaration(SortVisitor[Doc]):
         return h.local_decl(name, None, "beguine.sorts.Uninterpreted()")
 
 
-class BeguineKind(SortVisitor[Doc]):
+class BeguineKind(Memoized[Doc], shared=True):
     "Produces the class name for the sort metaclass (eg. sorts.Numeric(0, 3)). (TODO: this vs arbitrarygen?)"
 
     def bool(self):
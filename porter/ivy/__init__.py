@@ -3,20 +3,31 @@ from ivy import logic as log
 from ivy import ivy_module as imod
 from ivy import ivy_utils as iu
 
-from dataclasses import dataclass
+import functools
+
+from dataclasses import dataclass, field
 
 from pathlib import Path
 from typing import Iterable, Optional
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Position:
     filename: Path
     line: int
     reference: Optional["Position"]
 
+    # Where the chain of references ends, or None if that's here; see origin().
+    _origin: Optional["Position"] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_origin", self.reference.origin() if self.reference else None)
+
     @staticmethod
+    @functools.lru_cache(maxsize=1 << 16)
     def from_ivy(ivy_pos: iu.LocationTuple) -> "Position":
+        # Every node at a given location asks for that location's Position, over and over, so we only build one
+        # per location; that goes for each location along its reference chain, too.
         if not ivy_pos.filename:
             fn = Path("unknown")
         elif isinstance(ivy_pos.filename, Path):
@@ -33,9 +44,7 @@ class Position:
             return Position(fn, ivy_pos.line, None)
 
     def origin(self) -> "Position":
-        if not self.reference:
-            return self
-        return self.reference.origin()
+        return self._origin or self
 
 
 def symbols(im: imod.Module) -> Iterable[log.Const]:
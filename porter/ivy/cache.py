@@ -0,0 +1,73 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from pathlib import Path
+from typing import Optional
+
+from porter.ast import terms
+from porter.ast.terms import binary
+
+from . import config, includes
+
+# Bump this whenever the shape of a terms.Program changes, so that we don't load stale ASTs.
+FORMAT_VERSION = 4
+
+
+def fingerprint(isolate: Path, *options: str) -> str:
+    """A digest of everything that determines the Program we'd produce for `isolate`: its contents and those of
+    everything it includes, the version of Ivy, how we configured Ivy, and any conversion options."""
+    h = hashlib.sha256()
+    h.update(f"porter-program-v{FORMAT_VERSION}\0".encode())
+    h.update(f"ivy {config.ivy_version()}\0".encode())
+    h.update(json.dumps(config.settings(), sort_keys=True).encode())
+    for opt in options:
+        h.update(f"\0{opt}".encode())
+    for fn in [isolate.resolve()] + includes.transitive_includes(isolate):
+        h.update(f"\0{fn}\0".encode())
+        h.update(fn.read_bytes())
+    return h.hexdigest()
+
+
+class ProgramCache:
+    """An on-disk, content-addressed store of converted Programs, so that an isolate that hasn't changed
+    since we last saw it need not go through Ivy at all."""
+
+    root: Path
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def key(self, isolate: Path, *options: str) -> str:
+        return fingerprint(isolate, *options)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.prog"
+
+    def load(self, key: str) -> Optional[terms.Program]:
+        path = self._path(key)
+        try:
+            prog = binary.load_program(path)
+        except FileNotFoundError:
+            return None
+        except binary.FormatError as e:
+            logging.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+        logging.info(f"Cache hit for {key}")
+        return prog
+
+    def store(self, key: str, prog: terms.Program):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write-then-rename so that concurrent builds never observe a partially-written entry.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                binary.dump(prog, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
@@ -0,0 +1,60 @@
+from ivy import ivy_module as imod
+
+from typing import Iterable
+
+# The attributes of an Ivy node that hold its subterms and subactions.
+SUBTERMS = ("args", "terms", "func", "body", "t1", "t2")
+
+
+def mentions(*nodes) -> set[str]:
+    """Every name that the given Ivy terms and actions mention: the actions they call, the symbols they apply,
+    and so on.  This errs on the side of finding too much, since anything we miss won't be converted at all."""
+    ret: set[str] = set()
+    seen: set[int] = set()
+    worklist = list(nodes)
+    while worklist:
+        curr = worklist.pop()
+        if isinstance(curr, (list, tuple)):
+            worklist.extend(curr)
+            continue
+        if id(curr) in seen:
+            continue
+        seen.add(id(curr))
+
+        for attr in ("name", "rep"):
+            name = getattr(curr, attr, None)
+            if isinstance(name, str):
+                ret.add(name)
+        for attr in SUBTERMS:
+            sub = getattr(curr, attr, None)
+            if sub is not None and not isinstance(sub, str):
+                worklist.append(sub)
+    return ret
+
+
+class CallGraph:
+    """Which of a module's actions and definitions each of them refers to."""
+
+    edges: dict[str, set[str]]
+
+    def __init__(self, im: imod.Module):
+        defns = {lf.formula.defines().name: lf.formula.args[1] for lf in im.definitions + im.native_definitions}
+        nodes = set(im.actions.keys()) | set(defns.keys())
+
+        self.edges = {}
+        for name, act in im.actions.items():
+            self.edges[name] = mentions(act) & nodes
+        for name, rhs in defns.items():
+            self.edges[name] = mentions(rhs) & nodes
+
+    def reachable(self, roots: Iterable[str]) -> set[str]:
+        "The actions and definitions that any of `roots` refer to, directly or otherwise, including the roots."
+        ret = set()
+        worklist = [r for r in roots if r in self.edges]
+        while worklist:
+            curr = worklist.pop()
+            if curr in ret:
+                continue
+            ret.add(curr)
+            worklist.extend(self.edges[curr] - ret)
+        return ret
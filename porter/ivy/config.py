@@ -3,19 +3,44 @@ from ivy import ivy_compiler as ic
 from ivy import ivy_isolate as iiso
 from ivy import ivy_utils as iu
 
+import importlib.metadata
+
+# from ivy_to_cpp::main_int().
+PARAMETERS = {
+    'coi': 'false',
+    "create_imports": 'true',
+    "enforce_axioms": 'true',
+    'ui': 'none',
+    'isolate_mode': 'test',
+    'assume_invariants': 'false',
+    'compile_with_invariants': 'true',
+    'keep_destructors': 'true'
+}
+DETERMINIZE = True
+INTERPRET_ALL_SORTS = True
+VERIFYING = False
+
 
 def init_parameters():
-    # from ivy_to_cpp::main_int().
-    iu.set_parameters({
-        'coi': 'false',
-        "create_imports": 'true',
-        "enforce_axioms": 'true',
-        'ui': 'none',
-        'isolate_mode': 'test',
-        'assume_invariants': 'false',
-        'compile_with_invariants': 'true',
-        'keep_destructors': 'true'
-    })
-    ia.set_determinize(True)
-    iiso.set_interpret_all_sorts(True)
-    ic.set_verifying(False)
+    iu.set_parameters(dict(PARAMETERS))
+    ia.set_determinize(DETERMINIZE)
+    iiso.set_interpret_all_sorts(INTERPRET_ALL_SORTS)
+    ic.set_verifying(VERIFYING)
+
+
+def settings() -> dict:
+    "Everything init_parameters() configures Ivy with; anything that changes this can change what Ivy produces."
+    return {
+        "parameters": PARAMETERS,
+        "determinize": DETERMINIZE,
+        "interpret_all_sorts": INTERPRET_ALL_SORTS,
+        "verifying": VERIFYING,
+    }
+
+
+def ivy_version() -> str:
+    try:
+        return importlib.metadata.version("ms-ivy")
+    except importlib.metadata.PackageNotFoundError:
+        # Presumably running out of a source checkout that was never installed.
+        return "unknown"
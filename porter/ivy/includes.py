@@ -0,0 +1,88 @@
+from ivy import ivy_compiler as ic
+from ivy import ivy_utils as iu
+
+import re
+import threading
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+INCLUDE_DECL = re.compile(r"^\s*include\s+([\w.]+)", re.MULTILINE)
+
+
+def search_path(isolate: Path) -> list[Path]:
+    """Where Ivy looks for `include foo`: next to the isolate being compiled, then in its standard library.
+    (Note that nested includes are _not_ resolved relative to the file that includes them.)"""
+    return [isolate.parent, Path(iu.get_std_include_dir())]
+
+
+def resolve(name: str, dirs: list[Path]) -> Optional[Path]:
+    for d in dirs:
+        candidate = d / f"{name}.ivy"
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def transitive_includes(isolate: Path, dirs: Optional[list[Path]] = None) -> list[Path]:
+    """Every file that `isolate` pulls in, directly or otherwise, in the order we discover them.  This scans for
+    include declarations rather than asking Ivy, so that we can find out what an isolate depends on without
+    paying for a compile."""
+    if dirs is None:
+        dirs = search_path(isolate)
+
+    seen: set[Path] = set()
+    ret = []
+    worklist = [isolate]
+    while worklist:
+        curr = worklist.pop()
+        for name in INCLUDE_DECL.findall(curr.read_text()):
+            included = resolve(name, dirs)
+            if included is None:
+                # Ivy will complain about this soon enough.
+                continue
+            included = included.resolve()
+            if included in seen:
+                continue
+            seen.add(included)
+            ret.append(included)
+            worklist.append(included)
+    return ret
+
+
+# Ivy looks for included modules in the current working directory, then in its standard library.  We'd rather not
+# have to chdir() to the isolate to compile it (the working directory is shared by every thread in the process), so
+# we instead stand in for Ivy's importer with one that follows a search path of our choosing.
+_ivy_import_module = ic.import_module
+_active = threading.local()
+
+
+def import_module(name: str):
+    "Ivy's ivy_compiler.import_module(), but following the search path set by searching(), if there is one."
+    dirs = getattr(_active, "dirs", None)
+    if dirs is None:
+        return _ivy_import_module(name)
+    path = resolve(name, dirs)
+    if path is None:
+        raise iu.IvyError(None, f"module {name} not found in {', '.join(str(d) for d in dirs)}")
+    with open(path) as f:
+        with iu.SourceFile(str(path)):
+            return ic.read_module(f, nested=True)
+
+
+# Installed once, for good, when this module is imported, rather than by searching(): threads compile side by side, so
+# one of them putting Ivy's importer back on its way out would pull it out from under the others.  Outside of
+# searching() ours just hands off to Ivy's, so nothing else that uses Ivy in this process can tell the difference.
+ic.import_module = import_module
+
+
+@contextmanager
+def searching(dirs: list[Path]) -> Iterator[None]:
+    "Resolves the includes of whatever this thread compiles in the meantime along `dirs`."
+    prev = getattr(_active, "dirs", None)
+    _active.dirs = dirs
+    try:
+        yield
+    finally:
+        _active.dirs = prev
@@ -1,6 +1,8 @@
+import copy
 import dataclasses
 import logging
-import os
+import sys
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 
 from ivy import ivy_actions as iact
@@ -12,44 +14,84 @@ from ivy import logic as ilog
 from ivy import ivy_module as imod
 from ivy import ivy_utils as iu
 
-from porter.ast import Binding, sorts, terms
-from porter.ast.terms.visitor import SortVisitorOverTerms
-from porter.passes import native_rewriter
-from porter.passes.reinterpret_uninterps import InterpretUninterpretedVisitor
+from porter.ast import Binding, detach, sorts, terms
+from porter.ast.terms.hashcons import HashConser
+from porter.passes import native_rewriter, reinterpret_uninterps
+from porter.passes.manager import PassManager
 
-from . import members
+from . import callgraph, config, includes, members
+from .cache import ProgramCache
 
-from typing import Optional
+from types import GeneratorType
+from typing import Any, Callable, Generator, Iterator, Optional
 
 
 def compile_progtext(path: Path) -> iart.AnalysisGraph:
     logging.info(f"Compiling {path}")
 
-    cwd = os.getcwd()
-    os.chdir(path.parent)
-    with open(path) as f:
-        with iu.SourceFile(path):
-            ic.ivy_load_file(f, create_isolate=False)
-            iiso.create_isolate('this')
-        os.chdir(cwd)
+    with includes.searching(includes.search_path(path)):
+        with open(path) as f:
+            with iu.SourceFile(path):
+                ic.ivy_load_file(f, create_isolate=False)
+                iiso.create_isolate('this')
     return ic.ivy_new()
 
 
-def handle_isolate(path: Path) -> terms.Program:
+@contextmanager
+def fresh_module() -> Iterator[imod.Module]:
+    """A clean slate to compile an isolate into: a new global Ivy module, and Ivy's parameters put back
+    the way init_parameters() left them, in case compiling an earlier isolate in this process changed them."""
+    config.init_parameters()
     with imod.Module() as im:
-        compile_progtext(path)
-        return program_from_ivy(im)
+        yield im
+
+
+def conversion_options(reachable_only=False, hash_cons=False) -> list[str]:
+    "The options we convert a program with that change what the Program looks like, for fingerprinting."
+    ret = []
+    if reachable_only:
+        ret.append("reachable-only")
+    if hash_cons:
+        ret.append("hash-cons")
+    return ret
+
+
+def handle_isolate(path: Path, cache: Optional[ProgramCache] = None, reachable_only=False,
+                   hash_cons=False, key: Optional[str] = None) -> terms.Program:
+    """Converts the isolate at `path`, or loads it from `cache` if it's there.  If the caller has already worked
+    out the isolate's cache key (its fingerprint(), with our conversion_options()), it can pass it in as `key`
+    rather than have us hash everything over again."""
+    if cache is None:
+        with fresh_module() as im:
+            compile_progtext(path)
+            return program_from_ivy(im, reachable_only, hash_cons)
+
+    if key is None:
+        key = cache.key(path, *conversion_options(reachable_only, hash_cons))
+    prog = cache.load(key)
+    if prog is None:
+        with fresh_module() as im:
+            compile_progtext(path)
+            prog = program_from_ivy(im, reachable_only, hash_cons)
+        cache.store(key, prog)
+    return prog
+
+
+def intern(name):
+    """Identifiers recur across thousands of nodes, but Ivy hands us a fresh copy of the string for each
+    occurrence; share one instead."""
+    return sys.intern(name) if type(name) is str else name
 
 
 def binding_from_ivy_var(im: imod.Module, v: ilog.Var) -> Binding[sorts.Sort]:
-    name = v.rep
-    sort = sorts.from_ivy(im, v.sort)
+    name = intern(v.rep)
+    sort = sorts.resolve(im, v.sort)
     return Binding(name, sort)
 
 
 def binding_from_ivy_const(im: imod.Module, c: ilog.Const) -> Binding[sorts.Sort]:
-    name = c.name
-    sort = sorts.from_ivy(im, c.sort)
+    name = intern(c.name)
+    sort = sorts.resolve(im, c.sort)
     return Binding(name, sort)
 
 
@@ -59,11 +101,98 @@ PARAM_PREFIX = "prm:"
 def param_from_ivy_const(im: imod.Module, c: ilog.Const) -> Binding[sorts.Sort]:
     """A variation on binding_from_ivy_const: we give a special name to a parameter in order to ensure that
     we copy the parameter out in order to avoid aliasing."""
-    name = PARAM_PREFIX + c.name
-    sort = sorts.from_ivy(im, c.sort)
+    name = intern(PARAM_PREFIX + c.name)
+    sort = sorts.resolve(im, c.sort)
     return Binding(name, sort)
 
 
+# Conversion
+#
+# Each sort of Ivy node has a converter.  Leaves are converted by plain functions; a converter for a node with
+# subterms is instead a generator, which yields each Ivy subterm it needs converted, is sent back the Porter term
+# for it, and finally returns the Porter node it builds.  convert() drives these with an explicit stack of suspended
+# converters rather than by recursing, so that how deep a formula or action can nest isn't bounded by the stack.
+
+Converter = Callable[[imod.Module, Any], Any]
+
+CONVERTERS: dict[type, Converter] = {}
+
+
+def converts(*ivy_types: type):
+    "Registers the decorated function as the converter for Ivy nodes of the given types."
+
+    def register(f: Converter) -> Converter:
+        for t in ivy_types:
+            CONVERTERS[t] = f
+        return f
+
+    return register
+
+
+def converter_for(node) -> Converter:
+    t = type(node)
+    f = CONVERTERS.get(t)
+    if f is None:
+        # Some subclass of a type we know how to convert; find the nearest one and remember it for next time.
+        for base in t.__mro__[1:]:
+            if base in CONVERTERS:
+                f = CONVERTERS[t] = CONVERTERS[base]
+                break
+        else:
+            raise Exception(f"TODO: {node} ({t})")
+    return f
+
+
+def shared(node):
+    "The node that the active HashConser, if there is one, has for `node`."
+    conser = HashConser.active
+    if conser is not None:
+        return conser.share(node)
+    return node
+
+
+def convert(im: imod.Module, node) -> Any:
+    # Subterms come back before the terms built out of them do, so we share bottom-up, as HashConser needs.
+    ret = converter_for(node)(im, node)
+    if not isinstance(ret, GeneratorType):
+        return shared(ret)
+
+    stack = [ret]
+    ret = None
+    while stack:
+        try:
+            child = stack[-1].send(ret)
+        except StopIteration as done:
+            stack.pop()
+            ret = shared(done.value)
+            continue
+        ret = converter_for(child)(im, child)
+        if isinstance(ret, GeneratorType):
+            stack.append(ret)
+            ret = None
+        else:
+            ret = shared(ret)
+    return ret
+
+
+def each(nodes) -> Generator[Any, Any, list]:
+    "Converts each of `nodes` in turn, for converters to `yield from`."
+    ret = []
+    for node in nodes:
+        ret.append((yield node))
+    return ret
+
+
+def expr_from_ivy(im: imod.Module, expr) -> terms.Expr:
+    """Converts an Ivy term.  Inside a `with HashConser():` block, subterms that are the same as one that block has
+    already seen come back as that same node (see porter.ast.terms.hashcons)."""
+    return convert(im, expr)
+
+
+def action_from_ivy(im: imod.Module, act: iact.Action) -> terms.Action:
+    return convert(im, act)
+
+
 # Expression conversion
 
 def maybe_field_access_from_apply(im: imod.Module, app: terms.Apply) -> Optional[terms.FieldAccess]:
@@ -80,29 +209,23 @@ def maybe_field_access_from_apply(im: imod.Module, app: terms.Apply) -> Optional
         return None
     maybe_sort_name, field_name = t
 
-    if maybe_sort_name not in sorts.sorts_with_members(im):
-        return None
-
-    # At this point, we know that `maybe_sort_name` is indeed the name of a record.  The next thing to find out
-    # is whether `maybe_self` is the name of a field
-
     # Some gnarly surgery: the sort of app is unfortunately going to not tell us that this is a Record,
     # but rather that it's uninterpreted, so we have to determine that by whether its name is in the
-    # module's sort_destructors.
-    recordified = sorts.record_from_ivy(im, maybe_sort_name)
-    if field_name not in recordified.fields.keys():
+    # module's sort_destructors, and whether `field_name` is one of that record's fields.
+    if sorts.records(im).field(maybe_sort_name, field_name) is None:
         return None
 
-    return terms.FieldAccess(app.ivy_node, maybe_self, field_name)
+    return terms.FieldAccess(app.ivy_node, maybe_self, intern(field_name))
 
 
-def expr_from_apply(im: imod.Module, app: ilog.Apply) -> terms.Expr:
+@converts(ilog.Apply)
+def expr_from_apply(im: imod.Module, app: ilog.Apply):
     if app.func.name in ['+', "-", "*", "/", "<=", "<", ">", ">="]:
-        lhs = expr_from_ivy(im, app.args[0])
-        rhs = expr_from_ivy(im, app.args[1])
-        return terms.BinOp(app, lhs, app.func.name, rhs)
-    func = app.func.name  # expr_from_ivy(im, app.args[0])
-    args = [expr_from_ivy(im, a) for a in app.args]
+        lhs = yield app.args[0]
+        rhs = yield app.args[1]
+        return terms.BinOp(app, lhs, intern(app.func.name), rhs)
+    func = intern(app.func.name)  # expr_from_ivy(im, app.args[0])
+    args = yield from each(app.args)
 
     apply = terms.Apply(app, func, args)
 
@@ -112,99 +235,120 @@ def expr_from_apply(im: imod.Module, app: ilog.Apply) -> terms.Expr:
     return apply
 
 
+@converts(ilog.Const)
 def expr_from_const(_im: imod.Module, c: ilog.Const) -> terms.Constant:
-    return terms.Constant(c, c.name)
+    return terms.Constant(c, intern(c.name))
 
 
+@converts(ilog.Var)
 def expr_from_var(_im: imod.Module, v: ilog.Var) -> terms.Var:
-    return terms.Var(v, v.name)
+    return terms.Var(v, intern(v.name))
 
 
-def expr_from_atom(im: imod.Module, expr: iast.Atom) -> terms.Apply:
-    args = [expr_from_ivy(im, a) for a in expr.args]
-    return terms.Apply(expr, expr.rep, args)
+@converts(iast.Atom)
+def expr_from_atom(im: imod.Module, expr: iast.Atom):
+    args = yield from each(expr.args)
+    return terms.Apply(expr, intern(expr.rep), args)
 
 
-def expr_from_or(im: imod.Module, expr: ilog.Or) -> terms.Expr:
+@converts(ilog.Or)
+def expr_from_or(im: imod.Module, expr: ilog.Or):
     if len(expr.terms) == 0:
         return terms.Constant(expr, "false")
     else:
-        lhs = expr_from_ivy(im, expr.terms[0])
+        lhs = yield expr.terms[0]
         for r in expr.terms[1:]:
-            rhs = expr_from_ivy(im, r)
-            lhs = terms.BinOp(r, lhs, "or", rhs)
+            rhs = yield r
+            lhs = shared(terms.BinOp(r, lhs, "or", rhs))
         return lhs
 
 
-def expr_from_implies(im: imod.Module, expr: ilog.Implies) -> terms.Expr:
+@converts(ilog.Implies)
+def expr_from_implies(im: imod.Module, expr: ilog.Implies):
     assert len(expr.args) == 2
-    lhs = expr_from_ivy(im, expr.args[0])
-    rhs = expr_from_ivy(im, expr.args[1])
+    lhs = yield expr.args[0]
+    rhs = yield expr.args[1]
     return terms.BinOp(expr, lhs, "implies", rhs)
 
 
-def expr_from_eq(im: imod.Module, expr: ilog.Eq) -> terms.Expr:
-    lhs = expr_from_ivy(im, expr.t1)
-    rhs = expr_from_ivy(im, expr.t2)
+@converts(ilog.Eq)
+def expr_from_eq(im: imod.Module, expr: ilog.Eq):
+    lhs = yield expr.t1
+    rhs = yield expr.t2
     return terms.BinOp(expr, lhs, "==", rhs)
 
 
-def expr_from_not(im: imod.Module, expr: ilog.Not) -> terms.Expr:
-    lhs = expr_from_ivy(im, expr.args[0])
+@converts(ilog.Not)
+def expr_from_not(im: imod.Module, expr: ilog.Not):
+    lhs = yield expr.args[0]
     return terms.UnOp(expr, "~", lhs)
 
 
-def expr_from_and(im: imod.Module, expr: ilog.And) -> terms.Expr:
+@converts(ilog.And)
+def expr_from_and(im: imod.Module, expr: ilog.And):
     if len(expr.terms) == 0:
         return terms.Constant(expr, "true")
     else:
-        lhs = expr_from_ivy(im, expr.terms[0])
+        lhs = yield expr.terms[0]
         for r in expr.terms[1:]:
-            rhs = expr_from_ivy(im, r)
-            lhs = terms.BinOp(r, lhs, "and", rhs)
+            rhs = yield r
+            lhs = shared(terms.BinOp(r, lhs, "and", rhs))
         return lhs
 
 
-def expr_from_iff(im: imod.Module, expr: ilog.Iff) -> terms.BinOp:
-    ltor = expr_from_ivy(im, expr.args[0])
-    rtol = expr_from_ivy(im, expr.args[1])
+@converts(ilog.Iff)
+def expr_from_iff(im: imod.Module, expr: ilog.Iff):
+    ltor = yield expr.args[0]
+    rtol = yield expr.args[1]
     return terms.BinOp(expr, ltor, "iff", rtol)
 
 
-def expr_from_exists(im: imod.Module, fmla: ilog.Exists) -> terms.Exists:
+@converts(ilog.Exists)
+def expr_from_exists(im: imod.Module, fmla: ilog.Exists):
     variables = [binding_from_ivy_const(im, c) for c in fmla.variables]
-    body = expr_from_ivy(im, fmla.body)
+    body = yield fmla.body
     return terms.Exists(fmla, variables, body)
 
 
-def expr_from_forall(im: imod.Module, fmla: ilog.Exists) -> terms.Forall:
+@converts(ilog.ForAll)
+def expr_from_forall(im: imod.Module, fmla: ilog.Exists):
     variables = [binding_from_ivy_const(im, c) for c in fmla.variables]
-    body = expr_from_ivy(im, fmla.body)
+    body = yield fmla.body
     return terms.Forall(fmla, variables, body)
 
 
-def expr_from_native(im: imod.Module, expr: iast.NativeExpr) -> terms.NativeExpr:
+@converts(iast.NativeExpr)
+def expr_from_native(im: imod.Module, expr: iast.NativeExpr):
     code = str(expr.args[0])
-    args = [expr_from_ivy(im, a) for a in expr.args[1:]]
+    args = yield from each(expr.args[1:])
     return terms.NativeExpr(expr, "c++", code, args)
 
 
+@converts(iast.LabeledFormula)
+def expr_from_labeled_formula(im: imod.Module, expr: iast.LabeledFormula):
+    # XXX: Hacky.  Is it fine to throw out the label?
+    return (yield expr.args[1])
+
+
 def expr_binding_from_labeled_formula(im: imod.Module, fmla: iast.LabeledFormula) -> Binding[terms.Expr]:
     assert isinstance(fmla.label, iast.Atom)
     name = fmla.label.rep
-    decl = expr_from_ivy(im, fmla.formula)
+    # The formula may well be shared with other terms, so take our own copy of it before pointing it at the label.
+    decl = copy.copy(expr_from_ivy(im, fmla.formula))
     decl._ivy_node = fmla
     return Binding(name, decl)
 
 
-def expr_from_ite(im: imod.Module, ite: ilog.Ite) -> terms.Ite:
-    test = expr_from_ivy(im, ite.args[0])
-    then = expr_from_ivy(im, ite.args[1])
-    els = expr_from_ivy(im, ite.args[2])
+@converts(ilog.Ite)
+def expr_from_ite(im: imod.Module, ite: ilog.Ite):
+    test = yield ite.args[0]
+    then = yield ite.args[1]
+    els = yield ite.args[2]
     return terms.Ite(ite, test, then, els)
 
 
-def expr_from_some(im: imod.Module, expr: iast.Some) -> terms.Some:
+@converts(iast.Some)
+def expr_from_some(im: imod.Module, expr: iast.Some):
     if isinstance(expr, iast.SomeMin):
         strat = terms.SomeStrategy.MINIMISE
     elif isinstance(expr, iast.SomeMax):
@@ -213,93 +357,46 @@ def expr_from_some(im: imod.Module, expr: iast.Some) -> terms.Some:
         strat = terms.SomeStrategy.ARBITRARY
 
     variables = [binding_from_ivy_const(im, c) for c in expr.args[0:-1]]
-    fmla = expr_from_ivy(im, expr.args[-1])
+    fmla = yield expr.args[-1]
     return terms.Some(expr, variables, fmla, strat)
 
 
-def expr_from_ivy(im: imod.Module, expr) -> terms.Expr:
-    # Terminals
-    if isinstance(expr, ilog.Const):
-        return expr_from_const(im, expr)
-    if isinstance(expr, ilog.Var):
-        return expr_from_var(im, expr)
-
-    # Application (and maybe field access)
-    if isinstance(expr, ilog.Apply):
-        return expr_from_apply(im, expr)
-
-    # Binops
-    if isinstance(expr, ilog.And):
-        return expr_from_and(im, expr)
-    if isinstance(expr, ilog.Or):
-        return expr_from_or(im, expr)
-    if isinstance(expr, ilog.Implies):
-        return expr_from_implies(im, expr)
-    if isinstance(expr, ilog.Iff):
-        return expr_from_iff(im, expr)
-    if isinstance(expr, ilog.Eq):
-        return expr_from_eq(im, expr)
-
-    # Unary ops
-    if isinstance(expr, ilog.Not):
-        return expr_from_not(im, expr)
-
-    # Logic
-    if isinstance(expr, iast.Atom):
-        return expr_from_atom(im, expr)
-    if isinstance(expr, ilog.Exists):
-        return expr_from_exists(im, expr)
-    if isinstance(expr, ilog.ForAll):
-        return expr_from_forall(im, expr)
-    if isinstance(expr, iast.LabeledFormula):
-        # XXX: Hacky.  Is it fine to throw out the label?
-        return expr_from_ivy(im, expr.args[1])
-
-    # Ternary operators
-    if isinstance(expr, ilog.Ite):
-        return expr_from_ite(im, expr)
-
-    # TODOs
-    if isinstance(expr, iast.NativeExpr):
-        return expr_from_native(im, expr)
-    if isinstance(expr, iast.Some):
-        return expr_from_some(im, expr)
-
-    raise Exception(f"TODO: {expr} ({type(expr)})")
-
-
 # Action/statement conversion
 
 
-def if_from_ivy(im: imod.Module, iaction: iact.IfAction) -> terms.If:
-    cond = expr_from_ivy(im, iaction.args[0])
-    then = action_from_ivy(im, iaction.args[1])
+@converts(iact.IfAction)
+def if_from_ivy(im: imod.Module, iaction: iact.IfAction):
+    cond = yield iaction.args[0]
+    then = yield iaction.args[1]
     if len(iaction.args) > 2:
-        els = action_from_ivy(im, iaction.args[2])
+        els = yield iaction.args[2]
     else:
         els = None
     return terms.If(iaction, cond, then, els)
 
 
-def while_from_ivy(im: imod.Module, iaction: iact.WhileAction) -> terms.While:
-    cond = expr_from_ivy(im, iaction.args[0])
-    body = action_from_ivy(im, iaction.args[1])
+@converts(iact.WhileAction)
+def while_from_ivy(im: imod.Module, iaction: iact.WhileAction):
+    cond = yield iaction.args[0]
+    body = yield iaction.args[1]
     if len(iaction.args) > 2:
         # Slightly hacky but I can't be bothered to create an ast node for a Ranking yet.
-        measure = expr_from_ivy(im, iaction.args[2].args[0])
+        measure = yield iaction.args[2].args[0]
     else:
         measure = None
     return terms.While(iaction, cond, measure, body)
 
 
-def assert_from_ivy(im: imod.Module, iaction: iact.AssertAction) -> terms.Assert:
-    pred = expr_from_ivy(im, iaction.args[0])
+@converts(iact.AssertAction)
+def assert_from_ivy(im: imod.Module, iaction: iact.AssertAction):
+    pred = yield iaction.args[0]
     return terms.Assert(iaction, pred)
 
 
-def assign_from_ivy(im: imod.Module, iaction: iact.AssignAction) -> terms.Action:
-    lhs = expr_from_ivy(im, iaction.args[0])
-    rhs = expr_from_ivy(im, iaction.args[1])
+@converts(iact.AssignAction)
+def assign_from_ivy(im: imod.Module, iaction: iact.AssignAction):
+    lhs = yield iaction.args[0]
+    rhs = yield iaction.args[1]
     assn = terms.Assign(iaction, lhs, rhs)
 
     # if the LHS contains an (implicitly-declared) Var, then this means
@@ -310,17 +407,20 @@ def assign_from_ivy(im: imod.Module, iaction: iact.AssignAction) -> terms.Action
     return terms.Assign(iaction, lhs, rhs)
 
 
-def assume_from_ivy(im: imod.Module, iaction: iact.AssumeAction) -> terms.Assume:
-    pred = expr_from_ivy(im, iaction.args[0])
-    return terms.Assume(im, pred)
+@converts(iact.AssumeAction)
+def assume_from_ivy(im: imod.Module, iaction: iact.AssumeAction):
+    pred = yield iaction.args[0]
+    return terms.Assume(iaction, pred)
 
 
-def call_from_ivy(im: imod.Module, iaction: iact.CallAction) -> terms.Action:
+@converts(iact.CallAction)
+def call_from_ivy(im: imod.Module, iaction: iact.CallAction):
     assert isinstance(iaction.args[0], iast.Atom)  # Application expression
-    call_action = terms.Call(iaction, expr_from_atom(im, iaction.args[0]))
+    app = yield from expr_from_atom(im, iaction.args[0])
+    call_action = terms.Call(iaction, app)
     if len(iaction.args) == 2:
         # In this case, the call action returns a value.
-        lhs = expr_from_ivy(im, iaction.args[1])
+        lhs = yield iaction.args[1]
         rhs = call_action.app
         return terms.Assign(iaction, lhs, rhs)
     else:
@@ -329,15 +429,20 @@ def call_from_ivy(im: imod.Module, iaction: iact.CallAction) -> terms.Action:
         return call_action
 
 
-def debug_from_ivy(im: imod.Module, iaction: iact.DebugAction) -> terms.Debug:
+@converts(iact.DebugAction)
+def debug_from_ivy(im: imod.Module, iaction: iact.DebugAction):
     msg = repr(iaction.args[0])
-    args = [Binding(di.args[0], expr_from_ivy(im, di.args[1])) for di in iaction.args[1:]]
+    args = []
+    for di in iaction.args[1:]:
+        args.append(Binding(di.args[0], (yield di.args[1])))
     return terms.Debug(iaction, msg, args)
 
 
-def havok_from_ivy(im: imod.Module, iaction: iact.HavocAction) -> terms.Havok:
+@converts(iact.HavocAction)
+def havok_from_ivy(im: imod.Module, iaction: iact.HavocAction):
     with im:
-        modifies = [expr_from_ivy(im, m) for m in iaction.modifies()]
+        modified = iaction.modifies()
+    modifies = yield from each(modified)
     return terms.Havok(iaction, modifies)
 
 
@@ -353,47 +458,26 @@ def inits_from_ivy(im: imod.Module) -> list[terms.Action]:
     return ret
 
 
-def local_from_ivy(im: imod.Module, iaction: iact.LocalAction) -> terms.Let:
+@converts(iact.LocalAction)
+def local_from_ivy(im: imod.Module, iaction: iact.LocalAction):
     varnames = [binding_from_ivy_const(im, c) for c in iaction.args[:-1]]
-    act = action_from_ivy(im, iaction.args[-1])
-    return terms.Let(im, varnames, act)
+    act = yield iaction.args[-1]
+    return terms.Let(iaction, varnames, act)
 
 
-def native_act_from_ivy(im: imod.Module, iaction: iact.NativeAction) -> terms.NativeAct:
+@converts(iact.NativeAction)
+def native_act_from_ivy(im: imod.Module, iaction: iact.NativeAction):
     code = str(iaction.args[0])
-    args = [expr_from_ivy(im, a) for a in iaction.args[1:]]
+    args = yield from each(iaction.args[1:])
     return terms.NativeAct(iaction, "c++", code, args)
 
 
-def action_from_ivy(im: imod.Module, act: iact.Action) -> terms.Action:
-    if isinstance(act, iact.IfAction):
-        return if_from_ivy(im, act)
-    if isinstance(act, iact.WhileAction):
-        return while_from_ivy(im, act)
-
-    if isinstance(act, iact.AssignAction):
-        return assign_from_ivy(im, act)
-    if isinstance(act, iact.AssumeAction):
-        return assume_from_ivy(im, act)
-    if isinstance(act, iact.AssertAction):
-        return assert_from_ivy(im, act)
-    if isinstance(act, iact.CallAction):
-        return call_from_ivy(im, act)
-    if isinstance(act, iact.DebugAction):
-        return debug_from_ivy(im, act)
-    if isinstance(act, iact.HavocAction):
-        return havok_from_ivy(im, act)
-    if isinstance(act, iact.LocalAction):
-        return local_from_ivy(im, act)
-    if isinstance(act, iact.NativeAction):
-        return native_act_from_ivy(im, act)
-    if isinstance(act, iact.Sequence):
-        subacts = [action_from_ivy(im, a) for a in act.args]
-        if len(subacts) == 1:
-            return subacts[0]
-        return terms.Sequence(act, subacts)
-
-    raise Exception(f"TODO: {type(act)}")
+@converts(iact.Sequence)
+def sequence_from_ivy(im: imod.Module, iaction: iact.Sequence):
+    subacts = yield from each(iaction.args)
+    if len(subacts) == 1:
+        return subacts[0]
+    return terms.Sequence(iaction, subacts)
 
 
 def action_kind_from_name(im: imod.Module, name: str) -> terms.ActionKind:
@@ -429,7 +513,7 @@ def action_def_from_ivy(im: imod.Module, name: str, iaction: iact.Action) -> ter
     for p in iaction.formal_params:
         lhs = expr_from_const(im, p)
         rhs = expr_from_const(im, p)
-        rhs.rep = PARAM_PREFIX + rhs.rep
+        rhs.rep = intern(PARAM_PREFIX + rhs.rep)
         local_copying.append(terms.Assign(None, lhs, rhs))
 
     match body:
@@ -499,64 +583,87 @@ def sort_from_interped(im: imod.Module, name: str, ivy_sort) -> sorts.Sort:
             return sorts.BitVec(width)
         if interped in im.sig.interp:
             return sort_from_interped(im, im.sig.interp[name], ivy_sort)
-    return sorts.from_ivy(im, interped)
-
-
-def program_from_ivy(im: imod.Module) -> terms.Program:
-    porter_sorts = {}
-    for name, ivy_sort in list(im.sig.sorts.items()) + list(im.native_types.items()):
-        if name in im.sig.interp:
-            porter_sort = sort_from_interped(im, name, ivy_sort)
-        elif name in sorts.sorts_with_members(im):
-            porter_sort = sorts.record_from_ivy(im, name)
-        else:
-            porter_sort = sorts.from_ivy(im, ivy_sort)
-        if hasattr(porter_sort, "sort_name"):
-            porter_sort = dataclasses.replace(porter_sort, sort_name=name)
-        porter_sorts[name] = porter_sort
-
-    vardecls = [binding_from_ivy_const(im, sym) for sym in members(im)]
-    inits = inits_from_ivy(im)
-
-    actions = []
-    for name, ivy_act in im.actions.items():
-        actions.append(Binding(name, action_def_from_ivy(im, name, ivy_act)))
-
-    conjs = [expr_binding_from_labeled_formula(im, b) for b in im.labeled_conjs]
-
-    defns = []
-    for lf in im.definitions + im.native_definitions:
-        name = lf.formula.defines().name
-        # if name == "<":  # HACK
-        #    continue
-        if name in sorts.sorts_with_members(im):
-            continue
-        defns.append(Binding(name, function_def_from_ivy(im, lf.formula)))
-
-    ###
-    # AST passes
-    ###
-
-    # At this point, Records are going to marked as bound but typed as Uninterpreted. Do a pass to patch those up.
-    to_remap: dict[str, sorts.Sort] = {name: sorts.record_from_ivy(im, name) for name in sorts.sorts_with_members(im)}
-    to_remap.update({name: sort for name, sort in porter_sorts.items() if not isinstance(sort, sorts.Uninterpreted)})
-
-    # Irritating hack because we do not have yet a mechanism to set eg. client_id.max on the CLI just yet
-    for name, sort in to_remap.items():
-        if name.endswith("id"):
-            if isinstance(sort, sorts.Number) and not sort.hi_range:
-                to_remap[name] = sorts.Number(sort.sort_name, sort.lo_range, 3)
-
-    prog = terms.Program(im, porter_sorts, vardecls, inits, actions, defns, conjs)
-
-    reinterp = SortVisitorOverTerms(InterpretUninterpretedVisitor(to_remap))
-    reinterp.visit_program(prog)
-    reinterp.visit_program_sorts(prog, reinterp.sort_visitor)
-
-    # Now that we have correctly resolved Record sorts, transform the AST from function application to
-    # field accesses where appropriate.
-
-    # Patch up native code blocks.
-    native_rewriter.visit(prog)
-
-    return prog
+    return sorts.resolve(im, interped)
+
+
+def reachable_from_entry_points(im: imod.Module) -> set[str]:
+    """The names of the actions and definitions that the module's exported actions, initializers and
+    conjectures can reach.  Nothing else can ever be run, so needn't be extracted."""
+    graph = callgraph.CallGraph(im)
+    roots = {name for name in im.actions if action_kind_from_name(im, name) == terms.ActionKind.EXPORTED}
+    roots |= callgraph.mentions(im.initial_actions, [lf.formula for lf in im.labeled_conjs])
+    return graph.reachable(roots)
+
+
+def program_from_ivy(im: imod.Module, reachable_only=False, hash_cons=False) -> terms.Program:
+    """Converts the module into a Program.  With `reachable_only`, actions and definitions that nothing
+    exported can reach are left out (see reachable_from_entry_points()).  With `hash_cons`, expressions that
+    occur more than once in the program are shared between their occurrences (see expr_from_ivy())."""
+    wanted = reachable_from_entry_points(im) if reachable_only else None
+
+    # Every node we build from here on out resolves its sort through this.
+    with sorts.Resolver(im) as resolver, (HashConser() if hash_cons else nullcontext()):
+        records = resolver.records().records
+
+        porter_sorts = {}
+        for name, ivy_sort in list(im.sig.sorts.items()) + list(im.native_types.items()):
+            if name in im.sig.interp:
+                porter_sort = sort_from_interped(im, name, ivy_sort)
+            elif name in records:
+                porter_sort = records[name]
+            else:
+                porter_sort = sorts.resolve(im, ivy_sort)
+            if hasattr(porter_sort, "sort_name"):
+                porter_sort = dataclasses.replace(porter_sort, sort_name=name)
+            porter_sorts[name] = porter_sort
+
+        vardecls = [binding_from_ivy_const(im, sym) for sym in members(im)]
+        inits = inits_from_ivy(im)
+
+        actions = []
+        for name, ivy_act in im.actions.items():
+            if wanted is not None and name not in wanted:
+                continue
+            actions.append(Binding(name, action_def_from_ivy(im, name, ivy_act)))
+
+        conjs = [expr_binding_from_labeled_formula(im, b) for b in im.labeled_conjs]
+
+        defns = []
+        for lf in im.definitions + im.native_definitions:
+            name = lf.formula.defines().name
+            # if name == "<":  # HACK
+            #    continue
+            if name in records:
+                continue
+            if wanted is not None and name not in wanted:
+                continue
+            defns.append(Binding(name, function_def_from_ivy(im, lf.formula)))
+
+        ###
+        # AST passes
+        ###
+
+        # At this point, Records are going to marked as bound but typed as Uninterpreted. Do a pass to patch those up.
+        to_remap: dict[str, sorts.Sort] = dict(records)
+        to_remap.update({name: sort for name, sort in porter_sorts.items() if not isinstance(sort, sorts.Uninterpreted)})
+
+        # Irritating hack because we do not have yet a mechanism to set eg. client_id.max on the CLI just yet
+        for name, sort in to_remap.items():
+            if name.endswith("id"):
+                if isinstance(sort, sorts.Number) and not sort.hi_range:
+                    to_remap[name] = sorts.Number(sort.sort_name, sort.lo_range, 3)
+
+        prog = terms.Program(im, porter_sorts, vardecls, inits, actions, defns, conjs)
+
+        # Now that we have correctly resolved Record sorts, transform the AST from function application to
+        # field accesses where appropriate, and then patch up native code blocks.  The native rewriter has to see the
+        # sorts that reinterpretation leaves, so these take a walk over the program each (see SortPass).
+        prog = PassManager([
+            reinterpret_uninterps.reinterpreting(to_remap),
+            native_rewriter.rewriting(),
+        ]).run(prog)
+
+        # We've read everything we need out of the Ivy module, so don't keep it (and all its parse trees) alive.
+        detach(prog)
+
+        return prog
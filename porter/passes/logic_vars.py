@@ -16,6 +16,16 @@ class FreeVars(MutVisitor):
             self.vars.add(v.rep)
 
 
+def free_vars(prog: terms.Program) -> dict[str, set[str]]:
+    "The free Vars of each of the program's conjectures, by name; these are implicitly universally quantified."
+    ret = {}
+    for b in prog.conjectures:
+        fvs = FreeVars()
+        fvs.visit_expr(b.decl)
+        ret[b.name] = fvs.vars
+    return ret
+
+
 class BindVar(Visitor[terms.Expr]):
     "Binds a given Var within an Expression (that is, just turns it into a non-logical Constant with the same rep.)"
     bound_var: str
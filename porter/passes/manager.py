@@ -0,0 +1,228 @@
+import logging
+import time
+from dataclasses import dataclass
+
+from porter.ast import subterms
+from porter.ast.terms import Program
+from porter.ast.terms.locations import LocationIndex
+from porter.ast.terms.visitor import FusedVisitor, MutVisitor, SortVisitorOverTerms
+from porter.passes import logic_vars, quantifiers
+from porter.quantifiers import extensionality
+
+from typing import Any, Callable, Optional
+
+# Timings go out through this, at INFO; `porter --time-passes` turns it on.
+log = logging.getLogger("porter.passes")
+
+FREE_VARS = "free-vars"
+BOUND_EXPRS = "bound-exprs"
+NON_EXTENSIONALS = "non-extensionals"
+LOCATIONS = "locations"
+
+# Every analysis a pass can ask for, and how to work it out over a whole program.  Besides these, porter.passes
+# and porter.quantifiers hold only the transformations, each of which declares itself as a Pass alongside its
+# visitor (native_rewriter.rewriting() and reinterpret_uninterps.reinterpreting()), and helpers that work on a
+# single term rather than a program (BindVar, and the bounds of quantifiers), which aren't passes at all.
+ANALYSES: dict[str, Callable[[Program], Any]] = {
+    FREE_VARS: logic_vars.free_vars,
+    BOUND_EXPRS: quantifiers.bound_exprs,
+    NON_EXTENSIONALS: extensionality.non_extensionals,
+    LOCATIONS: LocationIndex,
+}
+
+ALL = tuple(ANALYSES)
+
+
+class Analyses:
+    """The results of the analyses of one Program that passes have asked for so far.  Each is worked out the first
+    time it's asked for, and then handed back until a pass that invalidates it runs.  A result that can bring
+    itself up to date (that has a refresh(), as a LocationIndex does) is refreshed then instead, so long as the
+    pass only replaced definitions whole rather than changing them in place, which refresh() can't see."""
+
+    prog: Program
+    results: dict[str, Any]
+
+    def __init__(self, prog: Program):
+        self.prog = prog
+        self.results = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.results
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.results:
+            self.results[name] = ANALYSES[name](self.prog)
+        return self.results[name]
+
+    def invalidate(self, names: tuple[str, ...], in_place: bool = True):
+        for name in names:
+            result = self.results.get(name)
+            if not in_place and hasattr(result, "refresh"):
+                result.refresh()
+            else:
+                self.results.pop(name, None)
+
+    def replace(self, prog: Program):
+        "Moves on to a new Program.  Results that can refresh themselves hang on to the old one, so they go."
+        self.prog = prog
+        self.results = {k: v for k, v in self.results.items() if not hasattr(v, "refresh")}
+
+
+class Pass:
+    """A transformation of a Program.  A pass names the analyses it reads (which it gets out of the Analyses it's
+    handed, already worked out) and those whose results it might change; if it doesn't say, it's assumed to change
+    all of them.  run() either changes the program in place or returns a new one.
+
+    Unless it's told otherwise (`in_place=False`, for a pass that only ever swaps whole definitions for new ones),
+    a pass is assumed to rewrite the nodes of definitions in place, too."""
+
+    name: str
+    requires: tuple[str, ...]
+    invalidates: tuple[str, ...]
+    in_place: bool
+
+    def __init__(self, name: str, requires: tuple[str, ...] = (), invalidates: tuple[str, ...] = ALL,
+                 in_place: bool = True):
+        self.name = name
+        self.requires = requires
+        self.invalidates = invalidates
+        self.in_place = in_place
+
+    def run(self, prog: Program, analyses: Analyses) -> Optional[Program]:
+        raise NotImplementedError()
+
+
+class FunctionPass(Pass):
+    "A pass that's just a function of the program and its analyses."
+
+    fn: Callable[[Program, Analyses], Optional[Program]]
+
+    def __init__(self, name: str, fn: Callable[[Program, Analyses], Optional[Program]],
+                 requires: tuple[str, ...] = (), invalidates: tuple[str, ...] = ALL, in_place: bool = True):
+        super().__init__(name, requires, invalidates, in_place)
+        self.fn = fn
+
+    def run(self, prog: Program, analyses: Analyses) -> Optional[Program]:
+        return self.fn(prog, analyses)
+
+
+class VisitorPass(Pass):
+    """A pass that's a MutVisitor over the program.  Consecutive VisitorPasses run together in a single traversal
+    (see FusedVisitor), so long as none of them reads an analysis that an earlier one of them invalidates, and
+    all of them are `fusable`."""
+
+    make: Callable[[Analyses], MutVisitor]
+    fusable = True
+
+    def __init__(self, name: str, make: Callable[[Analyses], MutVisitor],
+                 requires: tuple[str, ...] = (), invalidates: tuple[str, ...] = ALL):
+        super().__init__(name, requires, invalidates)
+        self.make = make
+
+    def run(self, prog: Program, analyses: Analyses) -> Optional[Program]:
+        v = self.make(analyses)
+        v.visit_program(prog)
+        self.finish(prog, v)
+        return None
+
+    def finish(self, prog: Program, v: MutVisitor):
+        "Anything left to do once the visitor's been over the program."
+        pass
+
+
+class SortPass(VisitorPass):
+    """A pass that re-sorts a program's terms with a SortVisitorOverTerms, and then the rest of its sorts.
+
+    Each of these needs to see the sorts that the one before it left, program sorts included, and those only
+    come out of finish(); fused, the later pass would see every term before the earlier one had re-sorted the
+    program's sorts, and re-sort them in a different order besides.  So they each get a walk of their own."""
+
+    fusable = False
+
+    def finish(self, prog: Program, v: MutVisitor):
+        assert isinstance(v, SortVisitorOverTerms)
+        v.visit_program_sorts(prog, v.sort_visitor)
+
+
+@dataclass
+class Timing:
+    name: str
+    seconds: float
+    nodes: Optional[int]  # How big the program was afterwards, if we were counting.
+
+    def __str__(self):
+        nodes = "" if self.nodes is None else f"{self.nodes:>10} nodes"
+        return f"{self.name:<48} {self.seconds * 1000:>10.2f} ms {nodes}"
+
+
+class PassManager:
+    """Runs a sequence of passes over a program, working out the analyses each needs (and only when the last result
+    has been invalidated), and recording how long each pass and analysis took.  If `count_nodes` (by default, if
+    timings are being logged), it also records how many nodes the program has after each; that's a walk over the
+    whole program apiece, so it's otherwise left off."""
+
+    passes: list[Pass]
+    timings: list[Timing]
+
+    def __init__(self, passes: list[Pass], count_nodes: Optional[bool] = None):
+        self.passes = passes
+        self.count_nodes = log.isEnabledFor(logging.INFO) if count_nodes is None else count_nodes
+        self.timings = []
+
+    def run(self, prog: Program) -> Program:
+        analyses = Analyses(prog)
+        for group in self.groups():
+            for name in dict.fromkeys(r for p in group for r in p.requires):
+                if name not in analyses:
+                    start = time.perf_counter()
+                    analyses[name]
+                    self.record(f"({name})", start, prog)
+
+            start = time.perf_counter()
+            if len(group) == 1:
+                ret = group[0].run(prog, analyses)
+                if ret is not None and ret is not prog:
+                    prog = ret
+                    analyses.replace(prog)
+            else:
+                self.run_fused(group, prog, analyses)
+            for p in group:
+                analyses.invalidate(p.invalidates, p.in_place)
+            self.record("+".join(p.name for p in group), start, prog)
+
+        if log.isEnabledFor(logging.INFO):
+            log.info(self.report())
+        return prog
+
+    def groups(self) -> list[list[Pass]]:
+        "The passes, with those that can share a traversal together."
+        ret: list[list[Pass]] = []
+        invalidated: set[str] = set()
+        for p in self.passes:
+            fusable = isinstance(p, VisitorPass) and p.fusable and not invalidated.intersection(p.requires)
+            if ret and fusable and all(isinstance(q, VisitorPass) and q.fusable for q in ret[-1]):
+                ret[-1].append(p)
+            else:
+                ret.append([p])
+                invalidated = set()
+            invalidated.update(p.invalidates)
+        return ret
+
+    @staticmethod
+    def run_fused(group: list[Pass], prog: Program, analyses: Analyses):
+        visitors = [p.make(analyses) for p in group if isinstance(p, VisitorPass)]
+        FusedVisitor(*visitors).visit_program(prog)
+        for p, v in zip(group, visitors):
+            assert isinstance(p, VisitorPass)
+            p.finish(prog, v)
+
+    def record(self, name: str, start: float, prog: Program):
+        seconds = time.perf_counter() - start
+        nodes = sum(1 for _ in subterms(prog)) if self.count_nodes else None
+        self.timings.append(Timing(name, seconds, nodes))
+
+    def report(self) -> str:
+        total = sum(t.seconds for t in self.timings)
+        lines = [str(t) for t in self.timings]
+        lines.append(str(Timing("total", total, None)))
+        return "\n".join(lines)
@@ -1,7 +1,8 @@
-from porter.ast import sorts, terms
+from porter.ast import AST, sorts, terms
 from porter.ast.sorts import Sort
 from porter.ast.sorts.visitor import Visitor as SortVisitor
 from porter.ast.terms.visitor import SortVisitorOverTerms
+from porter.passes.manager import BOUND_EXPRS, LOCATIONS, Analyses, SortPass
 
 from porter.ivy import Position
 
@@ -11,6 +12,20 @@ FileLine = tuple[str, int]
 
 
 def visit(prog: terms.Program):
+    nr = rewriter()
+    nr.visit_program(prog)
+    nr.visit_program_sorts(prog, nr.sort_visitor)
+
+
+def rewriting() -> SortPass:
+    """visit(), as a pass.  Native code is rewritten in place, which none of the analyses look into, but like any
+    SortVisitorOverTerms it rebuilds the bindings of quantifiers, which bound exprs refer to."""
+    return SortPass("native-rewriter", rewriter, invalidates=(BOUND_EXPRS,))
+
+
+def rewriter(analyses: Optional[Analyses] = None) -> "NativeRewriter":
+    """The rewriter that visit() runs, for running alongside other passes (see FusedVisitor).  Given the program's
+    analyses, it says which definition any native code it can't remap is in."""
     remap: dict[FileLine, str] = {
         # NativeActs
 
@@ -41,9 +56,7 @@ def visit(prog: terms.Program):
         ("collections_impl.ivy", 10): "`0`.size",
         ("collections_impl.ivy", 111): "a.slice(lo, hi)",
     }
-    nr = NativeRewriter("scala", remap)
-    nr.visit_program(prog)
-    nr.visit_program_sorts(prog, NativeRewriter.NativeSortRewriter("scala", remap))
+    return NativeRewriter("scala", remap, analyses)
 
 
 class NativeRewriter(SortVisitorOverTerms):
@@ -99,10 +112,22 @@ class NativeRewriter(SortVisitorOverTerms):
     mapping: dict[FileLine, str]
     sort_visitor: NativeSortRewriter
 
-    def __init__(self, new_lang: str, mapping: dict[FileLine, str]):
+    analyses: Optional[Analyses]
+
+    def __init__(self, new_lang: str, mapping: dict[FileLine, str], analyses: Optional[Analyses] = None):
         self.new_lang = new_lang
         self.mapping = mapping
         self.sort_visitor = self.NativeSortRewriter(new_lang, mapping)
+        self.analyses = analyses
+
+    def unmapped(self, node: AST, file: str, line: int) -> Exception:
+        msg = f"No Native remapping for {file}:{line}"
+        if self.analyses is not None:
+            # Only worth indexing the program for once something's gone wrong, so we don't ask for this up front.
+            sites = [site for site in self.analyses[LOCATIONS].sites_at(file, line) if site.node is node]
+            if sites:
+                msg += f" (in {sites[0].kind} {sites[0].name})"
+        return Exception(msg)
 
     def _finish_native_expr(self, node: terms.NativeExpr, args: list[None]):
         pos = node.pos()
@@ -114,7 +139,7 @@ class NativeRewriter(SortVisitorOverTerms):
             node.lang = self.new_lang
             node.fmt = remapped
         else:
-            raise Exception(f"No Native remapping for {file}:{line}")
+            raise self.unmapped(node, file, line)
 
 
     def _finish_native_action(self, act: terms.NativeAct, args: list[None]):
@@ -128,4 +153,4 @@ class NativeRewriter(SortVisitorOverTerms):
             act.lang = self.new_lang
             act.fmt = remapped
         else:
-            raise Exception(f"No Native remapping for {file}:{line}")
+            raise self.unmapped(act, file, line)
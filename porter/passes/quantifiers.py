@@ -1,4 +1,4 @@
-from porter.ast import Binding, sorts, terms
+from porter.ast import Binding, sorts, subterms, terms
 from porter.ast.terms.visitor import Visitor
 
 from enum import Enum
@@ -105,3 +105,18 @@ class BoundExprs(Visitor[list[terms.Expr]]):
         ret = self.visit_expr(node.expr)
         self.flip()
         return ret
+
+
+def bound_exprs(prog: terms.Program) -> dict[int, list[tuple[Binding[sorts.Sort], terms.Expr]]]:
+    """The bound exprs of every quantified formula in the program, keyed by the id() of the formula.  A formula
+    that's shared between several places in the program is only analysed once."""
+    ret = {}
+    for node in subterms(prog):
+        if id(node) in ret:
+            continue
+        match node:
+            case terms.Exists():
+                ret[id(node)] = BoundExprs.from_exists(node)
+            case terms.Forall():
+                ret[id(node)] = BoundExprs.from_forall(node)
+    return ret
@@ -1,13 +1,15 @@
 from porter.ast import sorts
 from porter.ast.sorts import Sort
-from porter.ast.sorts.visitor import Visitor as SortVisitor
+from porter.ast.sorts.visitor import Memoized
+from porter.ast.terms.visitor import SortVisitorOverTerms
+from porter.passes.manager import BOUND_EXPRS, SortPass
 
 from typing import Optional
 
 from porter.ivy import Position
 
 
-class InterpretUninterpretedVisitor(SortVisitor[Sort]):
+class InterpretUninterpretedVisitor(Memoized[Sort]):
     "Walks a sort and replaces all annotated Uninterpreted sorts with another one."
     # TODO: This does more than what the class name suggests, so we should rename it.
 
@@ -48,3 +50,9 @@ class InterpretUninterpretedVisitor(SortVisitor[Sort]):
         return sorts.Uninterpreted(name)
 
 
+def reinterpreting(mapping: dict[str, Sort]) -> SortPass:
+    """Re-sorts every term in a program according to `mapping`.  That rebuilds the bindings of quantifiers, which
+    bound exprs refer to."""
+    return SortPass("reinterpret-uninterps",
+                    lambda _: SortVisitorOverTerms(InterpretUninterpretedVisitor(mapping)),
+                    invalidates=(BOUND_EXPRS,))
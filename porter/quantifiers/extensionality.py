@@ -77,3 +77,10 @@ class NonExtensionals(MutVisitor):
         # b) otherwise, ever updated with a non-point lhs
         if not is_point_update(args):
             self.nons.add(relsym)
+
+
+def non_extensionals(prog: terms.Program) -> set[str]:
+    "The functions in the program that can't be given an extensional definition."
+    nons = NonExtensionals(prog.ivy_node)
+    nons.visit_program(prog)
+    return nons.nons
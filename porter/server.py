@@ -0,0 +1,118 @@
+""" A long-lived extraction server.  Importing Ivy and warming it up takes seconds, which dwarfs the time spent
+actually extracting a small isolate; editor integrations and incremental builds that call Porter over and over
+can instead talk to a resident server over a Unix socket.
+
+The protocol is newline-delimited JSON.  Each request is an object of the form
+    {"isolate": "/abs/path/to/foo.ivy", "width": 200, "backend": "scala", "reachable_only": false,
+     "reproducible": false, "hash_cons": false}
+(only "isolate" is required; relative paths are resolved against an optional "cwd"), and each response is
+either {"ok": true, "source": "..."} or {"ok": false, "error": "..."}.  Requests are served one at a time,
+since Ivy's state is process-global. """
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import tempfile
+
+from pathlib import Path
+from typing import Optional
+
+from porter import driver
+from porter.ivy import shims
+from porter.ivy.cache import ProgramCache
+
+# Standard library modules worth loading once up front, so that the first real request doesn't pay for
+# whatever Ivy imports or builds lazily on first use.
+WARMUP_INCLUDES = ["numbers", "collections"]
+
+
+def default_socket_path() -> Path:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(runtime_dir, f"porter-{os.getuid()}.sock")
+
+
+def warm_up():
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d, "warmup.ivy")
+        path.write_text("\n".join(["#lang ivy1.8"] + [f"include {i}" for i in WARMUP_INCLUDES]) + "\n")
+        try:
+            shims.handle_isolate(path)
+        except Exception as e:
+            logging.warning(f"Warming up Ivy failed (continuing anyway): {e}")
+
+
+class ExtractionHandler(socketserver.StreamRequestHandler):
+    server: "ExtractionServer"
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                source = self.server.extract(json.loads(line))
+                resp = {"ok": True, "source": source}
+            except Exception as e:
+                logging.exception("Extraction request failed")
+                resp = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(resp) + "\n").encode())
+            self.wfile.flush()
+
+
+class ExtractionServer(socketserver.UnixStreamServer):
+    cache: Optional[ProgramCache]
+
+    def __init__(self, path: Path, cache: Optional[ProgramCache] = None):
+        self.cache = cache
+        super().__init__(str(path), ExtractionHandler)
+
+    def extract(self, req: dict) -> str:
+        isolate = Path(req["isolate"])
+        if not isolate.is_absolute():
+            isolate = Path(req.get("cwd", os.getcwd()), isolate)
+        width = int(req.get("width", 200))
+        backend = req.get("backend", "scala")
+        reachable_only = bool(req.get("reachable_only", False))
+        reproducible = bool(req.get("reproducible", False))
+        hash_cons = bool(req.get("hash_cons", False))
+        # handle_isolate() compiles each request into a fresh Ivy module, so requests can't see each other.
+        return driver.extract_isolate(isolate, self.cache, width, backend, reachable_only, reproducible, hash_cons)
+
+
+def serve(path: Path, cache: Optional[ProgramCache] = None):
+    if path.exists():
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            try:
+                s.connect(str(path))
+            except OSError:
+                logging.info(f"Removing stale socket {path}")
+                path.unlink()
+            else:
+                raise Exception(f"Another server is already listening on {path}")
+
+    warm_up()
+    with ExtractionServer(path, cache) as server:
+        logging.info(f"Listening on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            path.unlink(missing_ok=True)
+
+
+def request(path: Path, isolate: Path, width=200, backend="scala", reachable_only=False, reproducible=False,
+            hash_cons=False) -> str:
+    "Asks the server listening on `path` to extract `isolate`."
+    req = {"isolate": str(isolate.absolute()), "width": width, "backend": backend, "reachable_only": reachable_only,
+           "reproducible": reproducible, "hash_cons": hash_cons}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(str(path))
+        with s.makefile("rwb") as f:
+            f.write((json.dumps(req) + "\n").encode())
+            f.flush()
+            resp = json.loads(f.readline())
+    if not resp["ok"]:
+        raise Exception(resp["error"])
+    return resp["source"]
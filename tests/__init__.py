@@ -6,6 +6,8 @@ from ivy import ivy_compiler as ic
 from ivy import ivy_module as imod
 from ivy import ivy_isolate as iiso
 
+from porter.ivy import config
+
 import io
 from typing import Any, Tuple
 
@@ -45,6 +47,7 @@ def compile_toplevel(tl: str) -> Tuple[imod.Module, ic.AnalysisGraph]:
 
 
 def compile_ivy(file) -> Tuple[imod.Module, ic.AnalysisGraph]:
+    config.init_parameters()
     with imod.Module() as im:
         if isinstance(file, str):
             file = io.StringIO(file)
@@ -0,0 +1,74 @@
+from . import progdir
+from .test_flat import small_program
+from porter.ast import sorts
+from porter.ast.terms import binary
+from porter.ivy import shims
+
+from pathlib import Path
+
+import pytest
+
+
+def test_roundtrip(tmp_path):
+    prog = small_program(share=True)
+    prog.sorts["msg"] = sorts.Record("msg", {"src": sorts.Number("pid", -1, 2 ** 40),
+                                             "kind": sorts.Enum("kind", ("ping", "pong"))})
+    fn = tmp_path / "small.prog"
+    with open(fn, "wb") as f:
+        binary.dump(prog, f)
+
+    loaded = binary.load(fn).to_program()
+    assert loaded == prog
+    assert loaded.sorts["msg"] is prog.sorts["msg"]
+
+    assign, assertion = loaded.actions[0].decl.body.stmts
+    assert assign.rhs is assertion.pred.rhs
+
+
+def test_lazy_decoding():
+    flat = binary.loads(binary.dumps(small_program()))
+    assert isinstance(flat.kind, memoryview)
+
+    [binop] = [i for i in range(len(flat)) if flat.name(i) == "<="]
+    node = flat.node(binop)
+    assert node.op == "<="
+    # Only x <= x + 1 has been decoded, and not the rest of the program.
+    assert len(flat._decoded) == 5
+    assert flat.symbols._entries.count(binary.Lazy) > 0
+
+
+def test_rejects_other_versions():
+    blob = bytearray(binary.dumps(small_program()))
+    blob[8] += 1
+    with pytest.raises(binary.FormatError):
+        binary.loads(blob)
+
+    with pytest.raises(binary.FormatError):
+        binary.loads(b"#lang ivy1.8\n")
+
+
+def test_converted_program(tmp_path):
+    prog = shims.handle_isolate(Path(progdir, "006_pingpong.ivy"))
+    fn = tmp_path / "pingpong.prog"
+    with open(fn, "wb") as f:
+        binary.dump(prog, f)
+    assert binary.load(fn).to_program() == prog
+
+
+def test_corrupt_files(tmp_path):
+    data = binary.dumps(small_program())
+    fn = tmp_path / "small.prog"
+
+    for corrupt in (data[:16], data[:len(data) // 2], data[:-3], data[:40] + b"\xff" * 64 + data[104:],
+                    bytes(b ^ 0x5a for b in data[:24]) + data[24:]):
+        fn.write_bytes(corrupt)
+        with pytest.raises(binary.FormatError):
+            binary.load_program(fn)
+
+    # Flipping any one byte of the file either still reads, or is caught.
+    for i in range(len(data)):
+        fn.write_bytes(data[:i] + bytes([data[i] ^ 0xff]) + data[i + 1:])
+        try:
+            binary.load_program(fn)
+        except binary.FormatError:
+            pass
@@ -0,0 +1,60 @@
+import os
+
+from . import progdir
+from .test_flat import small_program
+from porter import extraction
+from porter.ivy import shims
+from porter.ivy.cache import ProgramCache, fingerprint
+
+from pathlib import Path
+
+import pytest
+
+
+def test_cache_hit_skips_ivy(tmp_path, monkeypatch):
+    fn = Path(progdir, "006_pingpong.ivy")
+    cache = ProgramCache(tmp_path)
+
+    fresh = shims.handle_isolate(fn, cache)
+
+    def no_compiling(_path):
+        raise AssertionError("Cache hit should not have gone through Ivy")
+
+    monkeypatch.setattr(shims, "compile_progtext", no_compiling)
+    cached = shims.handle_isolate(fn, cache)
+
+    assert cached is not fresh
+    assert cached.sorts == fresh.sorts
+    # Modulo the timestamp in the header.
+    assert extraction.extract_scala(cached).splitlines()[1:] == extraction.extract_scala(fresh).splitlines()[1:]
+
+
+def test_fingerprint_tracks_includes(tmp_path):
+    isolate = tmp_path / "isolate.ivy"
+    isolate.write_text("#lang ivy1.8\ninclude numbers\ninclude helper\n")
+    helper = tmp_path / "helper.ivy"
+    helper.write_text("#lang ivy1.8\ntype t\n")
+
+    before = fingerprint(isolate)
+    assert fingerprint(isolate) == before
+
+    helper.write_text("#lang ivy1.8\ntype t\ntype u\n")
+    assert fingerprint(isolate) != before
+
+
+def test_fingerprint_tracks_options():
+    fn = Path(progdir, "001_hello.ivy")
+    assert fingerprint(fn) != fingerprint(fn, "some-option")
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = ProgramCache(tmp_path)
+    key = "ab" * 32
+    cache.store(key, small_program())
+    assert cache.load(key) == small_program()
+
+    path = cache._path(key)
+    data = path.read_bytes()
+    for corrupt in (data[:16], data[:len(data) // 2], data[:-3]):
+        path.write_bytes(corrupt)
+        assert cache.load(key) is None
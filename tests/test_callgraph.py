@@ -0,0 +1,49 @@
+from porter.ivy import callgraph, shims
+
+from . import compile_toplevel
+
+import unittest
+
+
+class CallGraphTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.im, _ = compile_toplevel("""
+            var count: nat
+
+            action bump(n: nat) returns (m: nat) = {
+                m := n + 1
+            }
+
+            action unused = {
+                count := 0
+            }
+
+            function doubled(n: nat): nat = n + n
+            function never(n: nat): nat = n + 42
+
+            export action go = {
+                count := doubled(bump(count))
+            }""")
+
+    def test_reachable(self):
+        reachable = shims.reachable_from_entry_points(self.im)
+        self.assertIn("bump", reachable)
+        self.assertIn("doubled", reachable)
+        self.assertNotIn("unused", reachable)
+        self.assertNotIn("never", reachable)
+
+    def test_mentions(self):
+        graph = callgraph.CallGraph(self.im)
+        go = [name for name in self.im.actions if name.endswith("go")]
+        self.assertEqual(graph.reachable(["unused"]), {"unused"})
+        self.assertIn("bump", graph.reachable(go))
+
+    def test_reachable_only(self):
+        everything = shims.program_from_ivy(self.im)
+        reachable = shims.program_from_ivy(self.im, reachable_only=True)
+
+        self.assertIn("unused", [b.name for b in everything.actions])
+        self.assertNotIn("unused", [b.name for b in reachable.actions])
+        self.assertIn("bump", [b.name for b in reachable.actions])
+        self.assertNotIn("never", [b.name for b in reachable.functions])
+        self.assertEqual(everything.individuals, reachable.individuals)
@@ -0,0 +1,101 @@
+import os
+import shutil
+
+from . import progdir
+from .test_programs import unit_tests
+from porter import driver
+from porter.ivy.cache import fingerprint
+
+from pathlib import Path
+
+import pytest
+
+
+def test_isolates_from_directory():
+    isolates = driver.isolates_from_paths([Path(progdir)])
+    assert Path(progdir, "001_hello.ivy") in isolates
+    assert all(p.suffix == ".ivy" and p.is_file() for p in isolates)
+    assert isolates == sorted(isolates)
+
+
+def test_extract_batch(tmp_path):
+    isolates = [Path(progdir, "001_hello.ivy"), Path(progdir, "006_pingpong.ivy")]
+    outputs = driver.extract_batch(isolates, tmp_path)
+
+    assert [o.name for o in outputs] == ["001_hello.scala", "006_pingpong.scala"]
+    for out in outputs:
+        assert "extends Protocol(a)" in out.read_text()
+
+    # Extracting after other isolates in the same process should be no different from extracting in isolation.
+    assert "pid" in outputs[1].read_text()
+    assert "msg_t" not in outputs[0].read_text()
+
+
+def test_extract_batch_colliding_names(tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    shutil.copy(os.path.join(progdir, "001_hello.ivy"), other)
+
+    with pytest.raises(Exception):
+        driver.extract_batch([Path(progdir, "001_hello.ivy"), other / "001_hello.ivy"], tmp_path / "out")
+
+
+def test_extract_batch_parallel(tmp_path):
+    isolates = driver.isolates_from_paths([Path(progdir)])
+
+    serial = driver.extract_batch(isolates, tmp_path / "serial")
+    parallel = driver.extract_batch(isolates, tmp_path / "parallel", jobs=4)
+
+    assert [p.name for p in serial] == [p.name for p in parallel]
+    for s, p in zip(serial, parallel):
+        # Modulo the timestamp in the header, the outputs should be the same.
+        assert s.read_text().splitlines()[1:] == p.read_text().splitlines()[1:]
+
+
+def test_extract_reproducible():
+    isolate = Path(progdir, "006_pingpong.ivy")
+
+    first = driver.extract_isolate(isolate, reproducible=True)
+    second = driver.extract_isolate(isolate, reproducible=True)
+    assert first == second
+    assert fingerprint(isolate) in first.splitlines()[0]
+
+
+@pytest.mark.parametrize("fn", unit_tests)
+def test_extract_hash_consed(fn):
+    isolate = Path(fn)
+
+    plain = driver.extract_isolate(isolate, reproducible=True)
+    shared = driver.extract_isolate(isolate, reproducible=True, hash_cons=True)
+    # Sharing expressions changes how the program is held, not what it extracts to (not even the line numbers
+    # of assertions and conjectures); but it's stamped as such.
+    assert shared.splitlines()[1:] == plain.splitlines()[1:]
+    assert shared.splitlines()[0] != plain.splitlines()[0]
+
+
+def test_reproducible_hashes_once(tmp_path, monkeypatch):
+    from porter.ivy import cache as cache_module
+    from porter.ivy.cache import ProgramCache
+
+    isolate = Path(progdir, "006_pingpong.ivy")
+    cache = ProgramCache(tmp_path)
+    expected = driver.extract_isolate(isolate, cache, reproducible=True)
+
+    calls = []
+
+    def counted(*args):
+        calls.append(args)
+        return fingerprint(*args)
+
+    monkeypatch.setattr(driver, "fingerprint", counted)
+    monkeypatch.setattr(cache_module, "fingerprint", counted)
+    assert driver.extract_isolate(isolate, cache, reproducible=True) == expected
+    assert len(calls) == 1
+
+
+def test_extract_incrementally_reproducible():
+    from porter.extraction.scala.incremental import DocCache
+
+    isolate = Path(progdir, "006_pingpong.ivy")
+    source = driver.extract_incrementally(isolate, DocCache(), reproducible=True)
+    assert source == driver.extract_isolate(isolate, reproducible=True)
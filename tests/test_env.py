@@ -0,0 +1,66 @@
+from porter.ast import Binding, sorts, terms
+from porter.ast.terms.env import Env
+from porter.passes import logic_vars
+
+import unittest
+
+NAT = sorts.Number.nat_sort()
+
+
+class EnvTests(unittest.TestCase):
+    def test_binding_leaves_the_original_alone(self):
+        empty = Env()
+        outer = empty.bind_all([Binding("X", NAT), Binding("Y", sorts.Bool())])
+        inner = outer.bind("X", sorts.Bool())
+
+        self.assertEqual(inner["X"], sorts.Bool())
+        self.assertEqual(outer["X"], NAT)
+        self.assertNotIn("X", empty)
+        self.assertEqual(inner.names(), {"X": sorts.Bool(), "Y": sorts.Bool()})
+        self.assertEqual(outer.names(), {"X": NAT, "Y": sorts.Bool()})
+        self.assertEqual(empty.names(), {})
+
+    def test_siblings(self):
+        root = Env().bind("X", NAT)
+        left = root.bind("Y", NAT)
+        right = root.bind("Z", NAT)
+
+        for _ in range(2):
+            self.assertIn("Y", left)
+            self.assertNotIn("Z", left)
+            self.assertIn("Z", right)
+            self.assertNotIn("Y", right)
+            self.assertIn("X", left)
+            self.assertIn("X", right)
+
+    def test_unsorted_bindings(self):
+        env = Env().bind("act", None)
+        self.assertIn("act", env)
+        self.assertIsNone(env.get("act"))
+        self.assertIsNone(env.get("other"))
+
+    def test_each_visitor_has_its_own(self):
+        outer, inner = logic_vars.FreeVars(), logic_vars.FreeVars()
+        self.assertIsNot(outer.env, inner.env)
+
+        class Nested(logic_vars.FreeVars):
+            def _var(self, v: terms.Var):
+                # A visitor run from within another's hooks doesn't see what's bound around it.
+                inner.visit_expr(v)
+                super()._var(v)
+
+        fmla = terms.Forall(None, [Binding("X", NAT)], terms.Var(None, "X"))
+        nested = Nested()
+        nested.visit_expr(fmla)
+        self.assertEqual(nested.vars, set())
+        self.assertEqual(inner.vars, {"X"})
+
+    def test_deeply_nested_binders(self):
+        depth = 20000
+        expr: terms.Expr = terms.Var(None, "X0")
+        for i in range(depth):
+            expr = terms.Forall(None, [Binding(f"X{i}", NAT)], terms.BinOp(None, terms.Var(None, f"X{i}"), "or", expr))
+        fvs = logic_vars.FreeVars()
+        fvs.visit_expr(expr)
+        self.assertEqual(fvs.vars, set())
+        self.assertEqual(fvs.env.names(), {})
@@ -5,9 +5,11 @@ from ivy import logic as ilog
 from . import compile_annotated_expr
 
 from porter.ast import terms, sorts
+from porter.ast.terms.hashcons import HashConser
 
 from porter.ivy.shims import expr_from_ivy
 
+import sys
 import unittest
 
 
@@ -68,3 +70,68 @@ class ExprTest(unittest.TestCase):
         expr = expr_from_ivy(None, ivy_expr)
         assert isinstance(expr, terms.Apply)
         self.assertEqual(expr.relsym, "inc")
+
+    def test_resolved_sorts_are_shared(self):
+        expr = "41 + 1"
+        im, compiled = compile_annotated_expr("nat", expr)
+
+        with sorts.Resolver(im) as resolver:
+            lhs = expr_from_ivy(im, compiled)
+            rhs = expr_from_ivy(im, compiled)
+        self.assertEqual(lhs.sort(), sorts.Number.nat_sort())
+        self.assertIs(lhs.sort(), rhs.sort())
+        self.assertIs(resolver.resolve(compiled), lhs.sort())
+
+    def test_deep_formula(self):
+        "How deeply a formula nests shouldn't be bounded by the recursion limit."
+        depth = 20000
+        fmla = ilog.Const("p", ilog.Boolean)
+        for _ in range(depth):
+            fmla = ilog.Not(fmla)
+
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(1000)
+        try:
+            with imod.Module() as im, sorts.Resolver(im):
+                expr = expr_from_ivy(im, fmla)
+        finally:
+            sys.setrecursionlimit(limit)
+
+        for _ in range(depth):
+            assert isinstance(expr, terms.UnOp)
+            expr = expr.expr
+        assert isinstance(expr, terms.Constant)
+        self.assertEqual(expr.rep, "p")
+
+    def test_hash_consing(self):
+        def not_p():
+            return ilog.Not(ilog.Const("p", ilog.Boolean))
+        fmla = ilog.And(not_p(), ilog.Or(not_p(), ilog.Const("q", ilog.Boolean)))
+
+        with imod.Module() as im, sorts.Resolver(im):
+            unshared = expr_from_ivy(im, fmla)
+            with HashConser() as conser:
+                shared = expr_from_ivy(im, fmla)
+                again = expr_from_ivy(im, not_p())
+
+        assert isinstance(unshared, terms.BinOp) and isinstance(unshared.rhs, terms.BinOp)
+        self.assertIsNot(unshared.lhs, unshared.rhs.lhs)
+
+        assert isinstance(shared, terms.BinOp) and isinstance(shared.rhs, terms.BinOp)
+        self.assertIs(shared.lhs, shared.rhs.lhs)
+        self.assertIs(shared.lhs, again)
+        self.assertIsNone(HashConser.active)
+
+        # not p, p, q, the disjunction, and the conjunction.
+        self.assertEqual(len(conser.table), 5)
+
+    def test_hash_consing_keeps_actions_apart(self):
+        # Assertions print their positions, so two of the same assertion from different lines mustn't be shared.
+        def assertion():
+            return terms.Assert(None, terms.Constant(None, "p"))
+
+        with HashConser() as conser:
+            first = conser.share(assertion())
+            second = conser.share(assertion())
+        self.assertIsNot(first, second)
+        self.assertEqual(len(conser.table), 0)
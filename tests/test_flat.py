@@ -0,0 +1,86 @@
+from . import progdir
+from porter.ast import Binding, Detached, sorts, subterms, terms
+from porter.ast.terms.flat import FlatProgram
+from porter.ast.terms.hashcons import HashConser
+from porter.ivy import Position, shims
+
+from pathlib import Path
+
+import unittest
+
+HERE = Position(Path("flat.ivy"), 3, None)
+NAT = sorts.Number.nat_sort()
+
+
+def nat(rep: str) -> terms.Expr:
+    return terms.Constant(Detached(HERE, NAT), rep)
+
+
+def small_program(share=False) -> terms.Program:
+    def incremented():
+        return terms.BinOp(Detached(HERE, NAT), nat("x"), "+", nat("1"))
+    inc = incremented()
+
+    body = terms.Sequence(None, [
+        terms.Assign(Detached(HERE, None), nat("x"), inc),
+        terms.Assert(Detached(HERE, None), terms.BinOp(Detached(HERE, sorts.Bool()), nat("x"), "<=",
+                                                       inc if share else incremented())),
+    ])
+    act = terms.ActionDefinition(None, terms.ActionKind.EXPORTED, [Binding("n", NAT)], [], body)
+    conj = terms.Forall(Detached(None, sorts.Bool()), [Binding("X", NAT)],
+                        terms.Apply(Detached(HERE, sorts.Bool()), "p", [terms.Var(Detached(HERE, NAT), "X")]))
+    return terms.Program(None, {"nat": NAT}, [Binding("x", NAT)], [], [Binding("inc", act)], [],
+                         [Binding("c", conj)])
+
+
+class FlatProgramTests(unittest.TestCase):
+    def test_roundtrip(self):
+        prog = small_program()
+        flat = FlatProgram.from_program(prog)
+
+        self.assertEqual(len(flat), len(list(subterms(prog))))
+        self.assertEqual(flat.to_program(), prog)
+
+    def test_post_order(self):
+        flat = FlatProgram.from_program(small_program())
+
+        self.assertIs(flat.kind_of(flat.root), terms.Program)
+        self.assertEqual(flat.first[flat.root], 0)
+        for i in range(len(flat)):
+            for c in flat.children(i):
+                self.assertIn(c, flat.subtree(i))
+                self.assertLess(c, i)
+
+    def test_linear_scans(self):
+        flat = FlatProgram.from_program(small_program())
+
+        self.assertEqual({flat.name(i) for i in flat.of_kind(terms.Constant)}, {"x", "1"})
+        self.assertEqual([flat.name(i) for i in flat.of_kind(terms.Var)], ["X"])
+
+        [act] = flat.of_kind(terms.ActionDefinition)
+        self.assertEqual(len(list(flat.of_kind(terms.BinOp, within=flat.subtree(act)))), 3)
+
+    def test_shared_nodes_stay_shared(self):
+        prog = small_program(share=True)
+        flat = FlatProgram.from_program(prog)
+        self.assertEqual(len(flat), len(list(subterms(prog))) - 3)
+
+        decoded = flat.to_program()
+        self.assertEqual(decoded, prog)
+        assign, assertion = decoded.actions[0].decl.body.stmts
+        self.assertIs(assign.rhs, assertion.pred.rhs)
+
+    def test_lazy_decoding(self):
+        flat = FlatProgram.from_program(small_program())
+        [var] = flat.of_kind(terms.Var)
+
+        node = flat.node(var)
+        self.assertEqual(node, terms.Var(Detached(HERE, NAT), "X"))
+        self.assertEqual(node.pos(), HERE)
+        self.assertIs(flat.node(var), node)
+
+
+def test_converted_program():
+    prog = shims.handle_isolate(Path(progdir, "003_linchain.ivy"))
+    flat = FlatProgram.from_program(prog)
+    assert flat.to_program() == prog
@@ -0,0 +1,60 @@
+import os
+
+from ivy import ivy_compiler as ic
+
+from porter.ivy import includes, shims
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+def write_isolate(d: Path, value: int) -> Path:
+    d.mkdir()
+    (d / "helper.ivy").write_text("\n".join(["#lang ivy1.8",
+                                             "include numbers",
+                                             f"function answer: nat = {value}"]))
+    isolate = d / "main.ivy"
+    isolate.write_text("\n".join(["#lang ivy1.8",
+                                  "include helper",
+                                  "var x: nat",
+                                  "after init { x := answer }"]))
+    return isolate
+
+
+def answer(isolate: Path) -> str:
+    prog = shims.handle_isolate(isolate)
+    [defn] = [b.decl for b in prog.functions if b.name == "answer"]
+    return repr(defn.body)
+
+
+def test_includes_resolve_next_to_the_isolate(tmp_path, monkeypatch):
+    isolate = write_isolate(tmp_path / "isolate", 1)
+    # A decoy, which Ivy would find if it were looking in the working directory.
+    decoy = write_isolate(tmp_path / "decoy", 2)
+    monkeypatch.chdir(decoy.parent)
+
+    assert "'1'" in answer(isolate)
+    assert Path(os.getcwd()) == decoy.parent
+
+
+def test_search_path_is_per_thread(tmp_path):
+    dirs = [[tmp_path / "a"], [tmp_path / "b"]]
+    seen = []
+
+    def search(d):
+        with includes.searching(d):
+            seen.append(includes._active.dirs)
+
+    with includes.searching([tmp_path]):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(search, dirs))
+        assert includes._active.dirs == [tmp_path]
+    assert sorted(seen) == sorted(dirs)
+
+
+def test_importer_outlives_searching(tmp_path):
+    with includes.searching([tmp_path]):
+        pass
+    # Other threads may still be searching, so the importer stays put; on its own it's Ivy's.
+    assert ic.import_module is includes.import_module
+    assert getattr(includes._active, "dirs", None) is None
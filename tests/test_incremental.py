@@ -0,0 +1,63 @@
+import os
+import shutil
+
+from . import progdir
+from porter import extraction
+from porter.extraction.scala.incremental import DocCache, IncrementalExtractor
+from porter.ivy import shims
+
+from pathlib import Path
+
+
+def extract(fn: Path, docs: DocCache) -> tuple[IncrementalExtractor, str]:
+    prog = shims.handle_isolate(fn)
+    extractor = IncrementalExtractor(docs, prog)
+    return extractor, extraction.extract_scala(prog, 120, extractor)
+
+
+def test_unchanged_isolate_is_all_hits():
+    fn = Path(progdir, "006_pingpong.ivy")
+    docs = DocCache()
+
+    first, first_source = extract(fn, docs)
+    assert first.hits == 0
+    assert first.misses > 0
+
+    second, second_source = extract(fn, docs)
+    assert second.misses == 0
+    assert second.hits == first.misses
+    assert first_source.splitlines()[1:] == second_source.splitlines()[1:]
+
+
+def test_only_changed_action_is_rebuilt(tmp_path):
+    fn = tmp_path / "counter.ivy"
+    shutil.copy(os.path.join(progdir, "005_counter.ivy"), fn)
+    docs = DocCache()
+
+    first, _ = extract(fn, docs)
+
+    fn.write_text(fn.read_text().replace("count := count - 1;", "count := count - 2;"))
+    second, source = extract(fn, docs)
+
+    assert "count - 2" in source
+    assert "count - 1" not in source
+    # Ivy may give us more than one action (e.g. the exported wrapper) for `dec`, but nothing else changed.
+    assert 0 < second.misses < first.misses
+    assert second.hits == first.misses - second.misses
+
+
+def test_moved_definitions_are_not_rebuilt(tmp_path):
+    fn = tmp_path / "counter.ivy"
+    shutil.copy(os.path.join(progdir, "005_counter.ivy"), fn)
+    docs = DocCache()
+
+    first, _ = extract(fn, docs)
+    before = dict(docs.entries)
+
+    # Shifting every definition down a line only changes what's printed for the invariant.
+    fn.write_text(fn.read_text().replace("#lang ivy1.8\n", "#lang ivy1.8\n\n", 1))
+    second, _ = extract(fn, docs)
+
+    rebuilt = {k for k, v in docs.entries.items() if before.get(k) != v}
+    assert rebuilt == {("conjecture", k[1]) for k in rebuilt}
+    assert 0 < second.misses == len(rebuilt) < first.misses
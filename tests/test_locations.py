@@ -0,0 +1,76 @@
+import dataclasses
+
+from porter.ast import Binding, Detached, sorts, terms
+from porter.ast.terms.locations import LocationIndex
+from porter.ivy import Position
+
+from pathlib import Path
+
+import unittest
+
+NAT = sorts.Number.nat_sort()
+LIB = Position(Path("/lib/collections.ivy"), 924, None)
+
+
+def at(line: int, reference=None) -> Detached:
+    return Detached(Position(Path("/src/isolate.ivy"), line, reference), NAT)
+
+
+def action(line: int, *stmts: terms.Action) -> terms.ActionDefinition:
+    return terms.ActionDefinition(at(line), terms.ActionKind.EXPORTED, [], [], terms.Sequence(None, list(stmts)))
+
+
+def program() -> terms.Program:
+    incr = action(10, terms.Assign(at(11), terms.Constant(at(11), "x"),
+                                   terms.BinOp(at(11), terms.Constant(at(11), "x"), "+", terms.Constant(at(11), "1"))))
+    native = action(20, terms.NativeAct(at(21, LIB), "c++", "++`0`;", [terms.Constant(at(21), "x")]))
+    return terms.Program(None, {"nat": NAT}, [Binding("x", NAT)], [],
+                         [Binding("incr", incr), Binding("native", native)], [], [])
+
+
+class LocationIndexTests(unittest.TestCase):
+    def test_lookup(self):
+        prog = program()
+        index = LocationIndex(prog)
+
+        self.assertEqual(len(index.nodes_at("isolate.ivy", 11)), 5)
+        self.assertEqual(index.nodes_at("isolate.ivy", 12), [])
+        self.assertEqual([name for name, _ in index.actions_at(Path("/src/isolate.ivy"), 11)], ["incr"])
+        self.assertIs(index.actions_at("isolate.ivy", 10)[0][1], prog.actions[0].decl)
+
+    def test_lookup_by_reference(self):
+        prog = program()
+        index = LocationIndex(prog)
+
+        [native] = index.nodes_at("collections.ivy", 924)
+        assert isinstance(native, terms.NativeAct)
+        self.assertEqual(index.nodes_at("isolate.ivy", 21)[0], native)
+        self.assertEqual([name for name, _ in index.actions_at("collections.ivy", 924)], ["native"])
+
+    def test_follows_replaced_definitions(self):
+        prog = program()
+        index = LocationIndex(prog)
+
+        prog.actions[0] = Binding("incr", action(30))
+        # Until we're told, we don't go looking.
+        self.assertEqual(len(index.nodes_at("isolate.ivy", 11)), 5)
+
+        index.refresh()
+        self.assertEqual(index.nodes_at("isolate.ivy", 11), [])
+        self.assertEqual([name for name, _ in index.actions_at("isolate.ivy", 30)], ["incr"])
+
+        del prog.actions[1]
+        index.refresh()
+        self.assertEqual(index.nodes_at("collections.ivy", 924), [])
+
+    def test_invalidate(self):
+        prog = program()
+        index = LocationIndex(prog)
+
+        body = prog.actions[0].decl.body
+        body.stmts = [dataclasses.replace(body.stmts[0], _ivy_node=at(12))]
+        self.assertEqual(len(index.nodes_at("isolate.ivy", 11)), 5)
+
+        index.invalidate("action", "incr")
+        self.assertEqual(len(index.nodes_at("isolate.ivy", 11)), 4)
+        self.assertEqual(len(index.nodes_at("isolate.ivy", 12)), 1)
@@ -0,0 +1,103 @@
+import dataclasses
+import functools
+import tracemalloc
+
+from . import progdir
+from porter.ast import AST, Binding, subterms, terms
+from porter.ivy import shims
+
+from pathlib import Path
+from typing import Any, Callable
+
+# The largest of our unit test programs.
+BENCHMARK = Path(progdir, "003_linchain.ivy")
+
+
+@functools.cache
+def unslotted(cls: type) -> type:
+    "A dataclass with the same fields as `cls`, but that keeps them in a __dict__, as our nodes once did."
+    return dataclasses.make_dataclass(f"Unslotted{cls.__name__}",
+                                      [(f.name, Any) for f in dataclasses.fields(cls)], eq=False)
+
+
+def rebuilt(val, slotted: bool):
+    """A copy of the nodes, bindings and lists in `val`, either just as they are or unslotted and with every
+    identifier a string of its own.  Anything else (positions, sorts, Ivy nodes) is shared with `val`."""
+    if isinstance(val, (AST, Binding)):
+        cls = type(val) if slotted else unslotted(type(val))
+        ret = object.__new__(cls)
+        for f in dataclasses.fields(val):
+            setattr(ret, f.name, rebuilt(getattr(val, f.name), slotted))
+        return ret
+    if isinstance(val, list):
+        return [rebuilt(v, slotted) for v in val]
+    if isinstance(val, dict):
+        return {k: rebuilt(v, slotted) for k, v in val.items()}
+    if isinstance(val, str) and not slotted and len(val) > 1:
+        return val.encode().decode()
+    return val
+
+
+def traced(make: Callable[[], Any]) -> int:
+    "How many bytes (as far as tracemalloc can tell) the result of `make()` takes."
+    # Once beforehand, so that we don't count making the unslotted classes.
+    make()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        ret = make()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del ret
+    return after - before
+
+
+def allocated(prog: terms.Program, slotted: bool) -> int:
+    return traced(lambda: rebuilt(prog, slotted))
+
+
+@functools.cache
+def slots_save(cls: type) -> int:
+    "How many bytes a single node of class `cls` takes unslotted, over what it takes slotted."
+    def empty(c: type):
+        ret = object.__new__(c)
+        for f in dataclasses.fields(cls):
+            setattr(ret, f.name, None)
+        return ret
+    return traced(lambda: empty(unslotted(cls))) - traced(lambda: empty(cls))
+
+
+def test_per_node_memory():
+    prog = shims.handle_isolate(BENCHMARK)
+    nodes = list(subterms(prog))
+
+    # Every node should save at least what slotting a lone node of its class does; interning identifiers, and
+    # slotting the bindings, only save more on top of that.
+    budget = allocated(prog, slotted=False) - sum(slots_save(type(n)) for n in nodes)
+    size = allocated(prog, slotted=True)
+    assert size <= budget, \
+        f"{len(nodes)} nodes take {size / len(nodes):.0f} bytes each, against {budget / len(nodes):.0f} budgeted"
+
+
+def test_nodes_are_slotted():
+    prog = shims.handle_isolate(BENCHMARK)
+    for node in subterms(prog):
+        assert not hasattr(node, "__dict__"), type(node)
+        pos = node.pos()
+        assert pos is None or not hasattr(pos, "__dict__")
+    for b in prog.individuals + prog.actions:
+        assert isinstance(b, Binding) and not hasattr(b, "__dict__")
+
+
+def test_identifiers_are_interned():
+    prog = shims.handle_isolate(BENCHMARK)
+    seen: dict[str, str] = {}
+    for node in subterms(prog):
+        if isinstance(node, terms.Apply):
+            name = node.relsym
+        elif isinstance(node, (terms.Constant, terms.Var)):
+            name = node.rep
+        else:
+            continue
+        assert seen.setdefault(name, name) is name
@@ -1,20 +1,23 @@
-from porter.ivy import shims
+from porter.ivy import includes, shims
 from porter.quantifiers.extensionality import NonExtensionals
-from porter.passes import logic_vars, native_rewriter
-from porter.ast import terms, sorts
+from porter.passes import logic_vars, native_rewriter, reinterpret_uninterps
+from porter.passes.manager import BOUND_EXPRS, FREE_VARS, LOCATIONS, FunctionPass, PassManager, VisitorPass
+from porter.ast import Binding, Detached, subterms, terms, sorts
+from porter.ivy import Position
+from porter.ast.terms.visitor import MutVisitor
 import os
 
+from pathlib import Path
+
 from . import compile_ivy, progdir
 
 import unittest
 
 
 def compile_and_parse(fn) -> terms.Program:
-    oldcwd = os.getcwd()
-    os.chdir(os.path.dirname(fn))
-    with open(fn) as f:
-        im, ag = compile_ivy(f)
-    os.chdir(oldcwd)
+    with includes.searching(includes.search_path(Path(fn))):
+        with open(fn) as f:
+            im, ag = compile_ivy(f)
     return shims.program_from_ivy(im)
 
 
@@ -58,3 +61,169 @@ class FreevarPasses(unittest.TestCase):
 def test_native_rewriter():
     prog = compile_and_parse(os.path.join(progdir, "006_pingpong.ivy"))
     native_rewriter.visit(prog)
+
+
+class PassManagerTests(unittest.TestCase):
+    @staticmethod
+    def program() -> terms.Program:
+        def fmla():
+            return terms.Apply(None, "p", [terms.Var(None, "X"), terms.Constant(None, "y")])
+        f = terms.FunctionDefinition(None, [], fmla())
+        return terms.Program(None, {}, [], [], [], [Binding("f", f)], [Binding("c", fmla())])
+
+    def test_analyses_are_cached_until_invalidated(self):
+        seen = []
+
+        def reads_free_vars(prog, analyses):
+            seen.append(analyses[FREE_VARS])
+
+        pm = PassManager([
+            FunctionPass("first", reads_free_vars, requires=(FREE_VARS,), invalidates=()),
+            FunctionPass("second", reads_free_vars, requires=(FREE_VARS,)),
+            FunctionPass("third", reads_free_vars, requires=(FREE_VARS,)),
+        ], count_nodes=True)
+        prog = pm.run(self.program())
+
+        self.assertEqual(seen[0], {"c": {"X"}})
+        self.assertIs(seen[0], seen[1])
+        self.assertIsNot(seen[1], seen[2])
+        self.assertEqual([t.name for t in pm.timings],
+                         ["(free-vars)", "first", "second", "(free-vars)", "third"])
+        self.assertTrue(all(t.nodes == len(list(subterms(prog))) for t in pm.timings))
+
+    def test_visitor_passes_share_a_traversal(self):
+        class Vars(MutVisitor):
+            def __init__(self):
+                self.vars = []
+
+            def _var(self, v: terms.Var):
+                self.vars.append(v.rep)
+
+        visitors = []
+
+        def make(_):
+            visitors.append(Vars())
+            return visitors[-1]
+
+        pm = PassManager([
+            VisitorPass("one", make, invalidates=()),
+            VisitorPass("two", make, invalidates=(FREE_VARS,)),
+            VisitorPass("three", make, requires=(FREE_VARS,)),
+        ])
+        pm.run(self.program())
+
+        self.assertEqual([v.vars for v in visitors], [["X"], ["X"], ["X"]])
+        # The last pass reads what the second invalidates, so it has to wait for another walk.
+        self.assertEqual([t.name for t in pm.timings], ["one+two", "(free-vars)", "three"])
+        self.assertIsNone(pm.timings[0].nodes)
+
+    def test_sort_passes_take_a_traversal_each(self):
+        pm = PassManager([
+            reinterpret_uninterps.reinterpreting({}),
+            native_rewriter.rewriting(),
+            VisitorPass("one", lambda _: MutVisitor(), invalidates=()),
+            VisitorPass("two", lambda _: MutVisitor(), invalidates=()),
+        ])
+        self.assertEqual([[p.name for p in group] for group in pm.groups()],
+                         [["reinterpret-uninterps"], ["native-rewriter"], ["one", "two"]])
+
+    def test_sort_passes_invalidate_bound_exprs(self):
+        nat = sorts.Number.nat_sort()
+        pred = terms.BinOp(Detached(None, sorts.Bool()), terms.Var(Detached(None, nat), "X"), "<",
+                           terms.Constant(Detached(None, nat), "3"))
+        fmla = terms.Forall(Detached(None, sorts.Bool()), [Binding("X", nat)], pred)
+        f = terms.FunctionDefinition(None, [], fmla)
+        prog = terms.Program(None, {"nat": nat}, [], [], [], [Binding("f", f)], [])
+
+        seen = []
+
+        def reads_bound_exprs(prog, analyses):
+            [(b, _)] = analyses[BOUND_EXPRS][id(fmla)]
+            seen.append(b)
+
+        pm = PassManager([
+            FunctionPass("before", reads_bound_exprs, requires=(BOUND_EXPRS,), invalidates=()),
+            native_rewriter.rewriting(),
+            FunctionPass("after", reads_bound_exprs, requires=(BOUND_EXPRS,), invalidates=()),
+        ])
+        pm.run(prog)
+
+        # The rewriter gave the quantifier new bindings; the second pass has to see those, not the old ones.
+        self.assertIsNot(seen[0], seen[1])
+        self.assertIs(seen[1], fmla.vars[0])
+        self.assertEqual([t.name for t in pm.timings],
+                         ["(bound-exprs)", "before", "native-rewriter", "(bound-exprs)", "after"])
+
+    def test_location_index_is_refreshed(self):
+        here = Position(Path("/src/isolate.ivy"), 7, None)
+        prog = self.program()
+        indices = []
+
+        def replaces_f(prog, analyses):
+            indices.append(analyses[LOCATIONS])
+            body = terms.Var(Detached(here, None), "Z")
+            prog.functions[0] = Binding("f", terms.FunctionDefinition(None, [], body))
+
+        def finds_f(prog, analyses):
+            indices.append(analyses[LOCATIONS])
+
+        PassManager([
+            FunctionPass("replace", replaces_f, requires=(LOCATIONS,), in_place=False),
+            FunctionPass("find", finds_f, requires=(LOCATIONS,)),
+        ]).run(prog)
+
+        # Kept, and brought up to date, rather than built over again.
+        self.assertIs(indices[0], indices[1])
+        [(kind, name)] = [(site.kind, site.name) for site in indices[1].sites_at("isolate.ivy", 7)]
+        self.assertEqual((kind, name), ("function", "f"))
+
+    def test_location_index_is_rebuilt_after_in_place_rewrites(self):
+        here = Position(Path("/src/isolate.ivy"), 7, None)
+
+        class Moves(MutVisitor):
+            def _var(self, v: terms.Var):
+                v._ivy_node = Detached(here, None)
+
+        found = []
+
+        def finds_x(prog, analyses):
+            found.extend(analyses[LOCATIONS].nodes_at("isolate.ivy", 7))
+
+        prog = self.program()
+        pm = PassManager([
+            FunctionPass("index", lambda prog, analyses: None, requires=(LOCATIONS,), invalidates=()),
+            VisitorPass("move", lambda _: Moves()),
+            FunctionPass("find", finds_x, requires=(LOCATIONS,)),
+        ])
+        pm.run(prog)
+
+        # The visitor moved X without replacing the function it's in, so the index had to be built over again.
+        self.assertEqual(found, [prog.functions[0].decl.body.args[0]])
+        self.assertEqual([t.name for t in pm.timings], ["(locations)", "index", "move", "(locations)", "find"])
+
+    def test_location_index_follows_new_programs(self):
+        here = Position(Path("/src/isolate.ivy"), 7, None)
+        body = terms.Var(Detached(here, None), "Z")
+        replacement = terms.Program(None, {}, [], [], [], [Binding("g", terms.FunctionDefinition(None, [], body))],
+                                    [])
+        found = []
+
+        def finds_g(prog, analyses):
+            found.extend(site.name for site in analyses[LOCATIONS].sites_at("isolate.ivy", 7))
+
+        PassManager([
+            FunctionPass("index", lambda prog, analyses: None, requires=(LOCATIONS,), invalidates=()),
+            FunctionPass("replace", lambda prog, analyses: replacement, invalidates=()),
+            FunctionPass("find", finds_g, requires=(LOCATIONS,)),
+        ]).run(self.program())
+
+        self.assertEqual(found, ["g"])
+
+    def test_unmapped_natives_name_their_definition(self):
+        here = Detached(Position(Path("/src/isolate.ivy"), 3, None), None)
+        native = terms.NativeAct(here, "c++", "++`0`;", [])
+        act = terms.ActionDefinition(None, terms.ActionKind.EXPORTED, [], [], native)
+        prog = terms.Program(None, {}, [], [], [Binding("bump", act)], [], [])
+
+        with self.assertRaisesRegex(Exception, r"No Native remapping for isolate.ivy:3 \(in action bump\)"):
+            PassManager([native_rewriter.rewriting()]).run(prog)
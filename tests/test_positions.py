@@ -0,0 +1,35 @@
+import pickle
+
+from ivy import ivy_utils as iu
+
+from porter.ivy import Position
+
+import unittest
+
+
+class PositionTests(unittest.TestCase):
+    def test_positions_are_shared(self):
+        inner = iu.LocationTuple(("collections.ivy", 12))
+        outer = iu.LocationTuple(("collections_impl.ivy", 40, inner))
+
+        pos = Position.from_ivy(outer)
+        self.assertIs(pos, Position.from_ivy(iu.LocationTuple(("collections_impl.ivy", 40, inner))))
+        self.assertIs(pos.reference, Position.from_ivy(inner))
+
+    def test_origin(self):
+        a = Position.from_ivy(iu.LocationTuple(("a.ivy", 1)))
+        b = Position.from_ivy(iu.LocationTuple(("b.ivy", 2, iu.LocationTuple(("a.ivy", 1)))))
+        c = Position.from_ivy(iu.LocationTuple(("c.ivy", 3, iu.LocationTuple(("b.ivy", 2, iu.LocationTuple(("a.ivy", 1)))))))
+
+        self.assertIs(a.origin(), a)
+        self.assertIs(b.origin(), a)
+        self.assertIs(c.origin(), a)
+
+    def test_hashable(self):
+        pos = Position.from_ivy(iu.LocationTuple(("b.ivy", 2, iu.LocationTuple(("a.ivy", 1)))))
+        copied = pickle.loads(pickle.dumps(pos))
+
+        self.assertEqual(copied, pos)
+        self.assertEqual(hash(copied), hash(pos))
+        self.assertEqual(copied.origin(), pos.origin())
+        self.assertEqual(len({pos, copied}), 1)
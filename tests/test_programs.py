@@ -5,7 +5,7 @@ import warnings
 
 from . import progdir
 from porter.ivy import shims
-from porter.ast import sorts, terms
+from porter.ast import Detached, sorts, subterms, terms
 from porter.extraction import scala
 from porter.pp import Doc
 from porter.pp.formatter import Naive
@@ -128,3 +128,8 @@ class ShimTestsForPingPong(unittest.TestCase):
         don't attempt to define any such thing but instead create an ordinary Scala enum."""
         self.assertIn("msg_type extends Enumeration", self.layout)
         self.assertNotIn("msg_type ping_kind;", self.layout)
+
+    def test_detached_from_ivy(self):
+        "Once conversion is done, nothing in the Program should keep the Ivy module alive."
+        for node in subterms(self.prog):
+            self.assertTrue(node.ivy_node is None or isinstance(node.ivy_node, Detached), node)
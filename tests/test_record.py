@@ -79,3 +79,17 @@ class RecordTest(unittest.TestCase):
 
         # extractor = scala.extract("test_field_gen", prog)
         pass
+
+    def test_record_index(self):
+        cls = """class foo = {
+                field x: nat
+                field y: bool
+              }"""
+        im, _ = compile_toplevel(cls)
+
+        index = sorts.RecordIndex(im)
+        self.assertEqual(index.records["foo"], sorts.record_from_ivy(im, "foo"))
+        self.assertEqual(index.field("foo", "x"), sorts.Number.nat_sort())
+        self.assertEqual(index.field("foo", "y"), sorts.Bool())
+        self.assertIsNone(index.field("foo", "z"))
+        self.assertIsNone(index.field("bar", "x"))
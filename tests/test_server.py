@@ -0,0 +1,41 @@
+import threading
+
+from . import progdir
+from porter import driver, server
+
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    path = tmp_path / "porter.sock"
+    srv = server.ExtractionServer(path)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield path
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_serve_extraction(socket_path):
+    fn = Path(progdir, "001_hello.ivy")
+    served = server.request(socket_path, fn, width=120)
+    direct = driver.extract_isolate(fn, width=120)
+    # Modulo the timestamp in the header.
+    assert served.splitlines()[1:] == direct.splitlines()[1:]
+
+    # The server must not leak state from one request into the next.
+    served = server.request(socket_path, Path(progdir, "006_pingpong.ivy"))
+    assert "msg_t" in served
+    served = server.request(socket_path, fn)
+    assert "msg_t" not in served
+
+
+def test_serve_errors(socket_path):
+    with pytest.raises(Exception, match="Unknown backend"):
+        server.request(socket_path, Path(progdir, "001_hello.ivy"), backend="cobol")
+
+    # ...and the server is still up afterwards.
+    assert "Protocol" in server.request(socket_path, Path(progdir, "001_hello.ivy"))
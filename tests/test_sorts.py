@@ -0,0 +1,51 @@
+import pickle
+
+from porter.ast import sorts
+from porter.ast.sorts.visitor import Memoized
+from porter.extraction.scala.sorts import UnboxedSort
+
+import unittest
+
+
+class HashConsingTests(unittest.TestCase):
+    def test_equal_sorts_are_identical(self):
+        rec = sorts.Record("msg_t", {"src": sorts.Number("pid", 0, 1), "payload": sorts.BitVec(8)})
+        f = sorts.Function([sorts.Number("pid", 0, 1)], rec)
+        g = sorts.Function((sorts.Number("pid", 0, 1),), sorts.Record("msg_t", rec.fields))
+
+        self.assertIs(f, g)
+        self.assertEqual(hash(f), hash(g))
+        self.assertEqual(f.domain, (sorts.Number("pid", 0, 1),))
+        self.assertIsNot(f, sorts.Function([sorts.Number("pid", 0, 2)], rec))
+
+    def test_field_order_matters(self):
+        xy = sorts.Record("r", {"x": sorts.Bool(), "y": sorts.Top()})
+        yx = sorts.Record("r", {"y": sorts.Top(), "x": sorts.Bool()})
+        self.assertIsNot(xy, yx)
+        self.assertEqual(list(xy.fields), ["x", "y"])
+
+    def test_unpickled_sorts_are_identical(self):
+        f = sorts.Function([sorts.Bool(), sorts.Enum("kind", ("ping", "pong"))], sorts.Number.nat_sort())
+        self.assertIs(pickle.loads(pickle.dumps(f)), f)
+
+    def test_memoized_visitor(self):
+        visits = []
+
+        class Counting(Memoized[int]):
+            def bool(self):
+                visits.append("bool")
+                return 1
+
+            def _finish_function(self, node, domain, range):
+                visits.append("function")
+                return sum(domain) + range
+
+        f = sorts.Function([sorts.Bool(), sorts.Bool()], sorts.Bool())
+        v = Counting()
+        self.assertEqual(v.visit_sort(f), 3)
+        self.assertEqual(v.visit_sort(f), 3)
+        self.assertEqual(visits, ["bool", "function"])
+
+    def test_shared_memo(self):
+        f = sorts.Function([sorts.Number.nat_sort()], sorts.Bool())
+        self.assertIs(UnboxedSort().visit_sort(f), UnboxedSort().visit_sort(f))
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+
+from pathlib import Path
+
+# How long importing the CLI may take, in seconds.  In practice it's tens of milliseconds; importing Ivy takes
+# seconds, so this is plenty of room to notice if anything starts pulling it in again.
+IMPORT_BUDGET = 0.5
+
+
+def run_python(code: str) -> subprocess.CompletedProcess:
+    # A fresh interpreter, since this one has imported everything already.
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=Path(__file__).parent.parent, capture_output=True, text=True, check=True)
+
+
+def cumulative_import_time(stderr: str, module: str) -> float:
+    "How long `-X importtime` says importing `module` took, in seconds."
+    for line in stderr.splitlines():
+        fields = [f.strip() for f in line.removeprefix("import time:").split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1e6
+    raise AssertionError(f"{module} was never imported")
+
+
+def test_cli_does_not_import_ivy():
+    proc = run_python("\n".join([
+        "import sys",
+        "from porter import main",
+        "for args in [['--help'], ['serve', '--help'], ['extract', '--help'], ['no-such-file.ivy']]:",
+        "    try:",
+        "        main(args)",
+        "    except SystemExit:",
+        "        pass",
+        "print('imported:', *(m for m in sys.modules if m == 'ivy' or m.startswith(('ivy.', 'porter.'))))",
+    ]))
+    assert proc.stdout.splitlines()[-1] == "imported:"
+
+
+def test_import_time_budget():
+    proc = run_python("import porter")
+    assert cumulative_import_time(proc.stderr, "porter") < IMPORT_BUDGET
@@ -1,9 +1,11 @@
 from porter.ast import Binding, sorts, terms
-from porter.ast.terms.visitor import Visitor, ImmutVisitor
+from porter.ast.terms.visitor import FusedVisitor, ImmutVisitor, MutVisitor, Visitor
+from porter.passes import logic_vars
 
 from .test_programs import compile_and_parse, unit_tests
 
 import pytest
+import sys
 
 from typing import Optional
 
@@ -132,3 +134,153 @@ def test_immut_visitor(fn):
     assert visitor.functions == ast.functions
     assert visitor.inits == ast.inits
     assert visitor.individuals == ast.individuals
+
+
+def test_mut_visitor_skips_uninteresting_subtrees():
+    class Natives(MutVisitor):
+        def __init__(self):
+            self.found = []
+
+        def _finish_native_action(self, act: terms.NativeAct, args: list[None]):
+            self.found.append(act.fmt)
+
+    class Vars(MutVisitor):
+        def __init__(self):
+            self.found = []
+
+        def _var(self, v: terms.Var):
+            self.found.append((v.rep, self.env.names()))
+
+    native = terms.NativeAct(None, "c++", "++`0`;", [terms.Constant(None, "x")])
+    fmla = terms.Exists(None, [Binding("X", sorts.Bool())], terms.Var(None, "X"))
+    body = terms.Sequence(None, [terms.Assert(None, fmla), terms.If(None, fmla, native, None)])
+
+    natives = Natives()
+    natives.visit_action(body)
+    assert natives.found == ["++`0`;"]
+    for kind in (terms.Assert, terms.Exists, terms.Var):
+        assert Natives._dispatch[kind] is MutVisitor._skip
+    assert Natives._dispatch[terms.If] is not MutVisitor._skip
+
+    vs = Vars()
+    vs.visit_action(body)
+    assert vs.found == [("X", {"X": sorts.Bool()}), ("X", {"X": sorts.Bool()})]
+    assert vs.env.names() == {}
+    assert Vars._dispatch[terms.NativeAct] is not MutVisitor._skip
+
+
+def test_deep_nesting():
+    "How deeply a program nests shouldn't be bounded by the recursion limit."
+    depth = 20000
+    expr = terms.Constant(None, "0")
+    for _ in range(depth):
+        expr = terms.BinOp(None, expr, "+", terms.Constant(None, "1"))
+    act = terms.Assign(None, terms.Constant(None, "x"), expr)
+    for _ in range(depth):
+        act = terms.Sequence(None, [act])
+
+    class NoOpImmutVisitor(ImmutVisitor):
+        pass
+
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(1000)
+    try:
+        counter = ExprCounter()
+        counter.visit_action(act)
+        copied = NoOpImmutVisitor().visit_action(act)
+    finally:
+        sys.setrecursionlimit(limit)
+
+    assert counter.n_expr_nodes == 2 * depth + 2
+    assert counter.n_action_nodes == depth + 1
+
+    for _ in range(depth):
+        assert isinstance(copied, terms.Sequence)
+        [copied] = copied.stmts
+    assert isinstance(copied, terms.Assign)
+
+
+def test_fused_visitor():
+    class Log(MutVisitor):
+        def __init__(self, name: str, log: list):
+            self.name = name
+            self.log = log
+
+        def _var(self, v: terms.Var):
+            self.log.append((self.name, v.rep))
+
+        def _finish_binop(self, node: terms.BinOp, lhs: None, rhs: None):
+            self.log.append((self.name, node.op))
+
+    class OutsideQuantifiers(Log):
+        def _begin_exists(self, node: terms.Exists):
+            return True
+
+    class Natives(MutVisitor):
+        def __init__(self):
+            self.found = []
+
+        def _finish_native_action(self, act: terms.NativeAct, args: list[None]):
+            self.found.append(act.fmt)
+
+    fmla = terms.BinOp(None,
+                       terms.Var(None, "X"),
+                       "and",
+                       terms.Exists(None, [Binding("Y", sorts.Bool())], terms.BinOp(None, terms.Var(None, "Y"), "or", terms.Var(None, "X"))))
+    native = terms.NativeAct(None, "c++", "++`0`;", [terms.Constant(None, "x")])
+    body = terms.Sequence(None, [terms.Assert(None, fmla), native])
+
+    log = []
+    natives = Natives()
+    free_vars = logic_vars.FreeVars()
+    FusedVisitor(Log("all", log), OutsideQuantifiers("outside", log), natives, free_vars).visit_action(body)
+
+    assert log == [("all", "X"), ("outside", "X"),
+                   ("all", "Y"), ("all", "X"), ("all", "or"),
+                   ("all", "and"), ("outside", "and")]
+    assert natives.found == ["++`0`;"]
+    assert free_vars.vars == {"X"}
+
+    # Run one after another, each would have seen the same, in the same order.
+    for cls, name in ((Log, "all"), (OutsideQuantifiers, "outside")):
+        alone = []
+        cls(name, alone).visit_action(body)
+        assert alone == [entry for entry in log if entry[0] == name]
+
+
+def test_fused_visitor_definitions():
+    class Defns(MutVisitor):
+        def __init__(self):
+            self.seen = []
+
+        def _var(self, v: terms.Var):
+            self.seen.append(v.rep)
+
+        def _finish_action_def(self, name: str, defn: terms.ActionDefinition, body: None):
+            self.seen.append(name)
+
+        def _finish_function_def(self, name: str, defn: terms.FunctionDefinition, body: None):
+            self.seen.append(name)
+
+    class SkipsActions(Defns):
+        def _begin_action_def(self, name: str, defn: terms.ActionDefinition):
+            return f"skipped {name}"
+
+    act = terms.ActionDefinition(None, terms.ActionKind.EXPORTED, [], [],
+                                 terms.Assert(None, terms.Var(None, "X")))
+    f = terms.FunctionDefinition(None, [], terms.Var(None, "Y"))
+    prog = terms.Program(None, {}, [], [], [Binding("a", act)], [Binding("f", f)], [])
+
+    fused = [Defns(), SkipsActions()]
+    FusedVisitor(*fused).visit_program(prog)
+    alone = [Defns(), SkipsActions()]
+    for v in alone:
+        v.visit_program(prog)
+
+    for v, w in zip(fused, alone):
+        assert v.seen == w.seen
+        assert v.actions == w.actions
+        assert v.functions == w.functions
+    assert fused[0].actions == [Binding("a", None)]
+    assert fused[1].actions == ["skipped a"]
+    assert fused[1].seen == ["Y", "f"]